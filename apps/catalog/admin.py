@@ -9,6 +9,7 @@ from .models import (
     Crosswalk,
     TemporalCollection,
     CuratedCollection,
+    ScrapeRun,
 )
 
 
@@ -34,6 +35,7 @@ class DataSetAdmin(admin.ModelAdmin):
     fields = [
         "name",
         "description",
+        "tags",
         "scraper",
         ("publisher", "region"),
         ("start_date", "end_date"),
@@ -42,8 +44,10 @@ class DataSetAdmin(admin.ModelAdmin):
         "quality_score",
         "temporal_collection",
         "curated_collections",
+        ("last_fetched_at", "last_seen_at", "missed_runs", "withdrawn_at"),
     ]
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = ("created_at", "updated_at", "last_fetched_at", "last_seen_at", "missed_runs")
+    list_filter = [("withdrawn_at", admin.EmptyFieldListFilter)]
     inlines = [
         DataSetFileInline,
     ]
@@ -98,3 +102,30 @@ class CuratedCollectionAdmin(admin.ModelAdmin):
 
 
 admin.site.register(CuratedCollection, CuratedCollectionAdmin)
+
+
+class ScrapeRunAdmin(admin.ModelAdmin):
+    list_display = [
+        "scraper",
+        "started_at",
+        "status",
+        "duration_seconds",
+        "listed",
+        "fetched",
+        "skipped",
+        "failed",
+        "inserted",
+        "updated",
+        "withdrawn",
+        "requests",
+        "rate_limited",
+    ]
+    list_filter = ["scraper", "status", "incremental"]
+    date_hierarchy = "started_at"
+    readonly_fields = [field.name for field in ScrapeRun._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(ScrapeRun, ScrapeRunAdmin)
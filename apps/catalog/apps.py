@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class CatalogConfig(AppConfig):
+    name = "apps.catalog"
+
+    def ready(self):
+        # connects the search index's signal receivers
+        from . import search  # noqa: F401
@@ -0,0 +1,69 @@
+"""
+Facet counts for the search filters.
+
+Each facet is counted with a single grouped query over the current results,
+so the search page runs the same number of queries however many regions,
+publishers or file types there are. Counts for the whole catalog (search
+with no query or filters) are cached until the next ingest run finishes or
+a dataset is edited (see stats.catalog_version).
+"""
+
+from typing import NamedTuple
+from django.core.cache import cache
+from django.db.models import Count
+from .models import DataSet, FileType, PublisherKind
+from .stats import catalog_version
+
+FACET_CACHE_SECONDS = 24 * 60 * 60
+
+# facet (also the search filter parameter): (field counted, field with its label)
+FACET_FIELDS = {
+    "pubtype": ("publisher__kind", None),
+    "region": ("region__country_code", None),
+    "filetype": ("files__file_type", None),
+    "license": ("license", None),
+    "collection": ("temporal_collection", "temporal_collection__name"),
+}
+CHOICE_LABELS = {"pubtype": dict(PublisherKind.choices), "filetype": dict(FileType.choices)}
+
+
+class FacetValue(NamedTuple):
+    value: str
+    label: str
+    count: int
+
+
+def facet_counts(queryset) -> dict[str, list[FacetValue]]:
+    """count datasets in `queryset` per value of each facet, most common first"""
+    # ordering (e.g. search rank) would be added to the GROUP BY
+    queryset = queryset.order_by()
+    facets = {}
+    for facet, (field, label_field) in FACET_FIELDS.items():
+        rows = queryset.exclude(**{f"{field}__isnull": True})
+        if label_field:
+            rows = rows.values(field, label_field)
+        else:
+            rows = rows.exclude(**{field: ""}).values(field)
+        # files__ joins a row per file
+        rows = rows.annotate(count=Count("id", distinct=field.startswith("files__"))).order_by(
+            "-count", field
+        )
+        labels = CHOICE_LABELS.get(facet, {})
+        facets[facet] = [
+            FacetValue(
+                str(row[field]),
+                str(row[label_field] if label_field else labels.get(row[field], row[field])),
+                row["count"],
+            )
+            for row in rows
+        ]
+    return facets
+
+
+def catalog_facets() -> dict[str, list[FacetValue]]:
+    """facet_counts for every active dataset, cached until the catalog changes"""
+    return cache.get_or_set(
+        f"catalog-facets:{catalog_version()}",
+        lambda: facet_counts(DataSet.objects.active()),
+        FACET_CACHE_SECONDS,
+    )
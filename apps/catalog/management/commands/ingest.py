@@ -4,9 +4,44 @@ import os
 import shutil
 import json
 import glob
+import re
+import sys
+import gzip
+import logging
+import subprocess
+import time
+import queue
+import asyncio
+import inspect
+import threading
+from collections import Counter, defaultdict
+from itertools import batched
+from datetime import date, datetime, UTC
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from typing import Annotated
+import typer
+from rich.console import Console
+from rich.table import Table
 from django_typer.management import Typer
-from ingestion.utils import logger
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from pydantic import ValidationError
+from ingestion.utils import (
+    logger,
+    configure_cache,
+    configure_conditional_requests,
+    configure_rate_limits,
+    configure_lookups,
+    commit_validators,
+    NotModified,
+    request_time,
+)
 from ingestion.data_models import UpstreamDataset
+from ingestion.metrics import metrics
 from apps.catalog.models import (
     DataSet,
     Publisher,
@@ -14,62 +49,659 @@ from apps.catalog.models import (
     Region,
     DataSetFile,
     IdentifierKind,
+    ScrapeRun,
+    RunStatus,
 )
+from apps.catalog.search import index_datasets
+from apps.catalog.stats import invalidate_catalog
 from functools import cache
+from ingestion import registry
 
 
 app = Typer()
 
+# JSONL staging file suffix for each --compress option
+STAGING_SUFFIXES = {"none": ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+# datasets staged between checkpoint writes
+CHECKPOINT_EVERY = 100
+# datasets per transaction in ingest_to_db
+INGEST_CHUNK_SIZE = 500
+# results buffered between an async scraper's event loop & the staging writer
+ASYNC_BUFFER_SIZE = 100
+# consecutive runs a dataset can be missing upstream before it's withdrawn
+DEFAULT_GRACE_RUNS = 2
+DATASET_UPDATE_FIELDS = [
+    "name",
+    "description",
+    "upstream_upload_time",
+    "start_date",
+    "end_date",
+    "region",
+    "source_url",
+    "license",
+    "tags",
+    "alternate_names",
+    "alternate_descriptions",
+    "quality_score",
+    "scraper",
+    "updated_at",
+]
+# per-scraper output from --all runs
+ALL_LOG_DIR = "_logs/ingest"
+
 
 @app.command()
-def command(self, name: str, cleardb: bool = False, ingestonly: bool = False):
+def command(
+    self,
+    name: Annotated[str | None, typer.Argument()] = None,
+    run_all: Annotated[bool, typer.Option("--all")] = False,
+    jobs: int = 0,
+    cleardb: bool = False,
+    ingestonly: bool = False,
+    workers: int = 1,
+    incremental: bool = False,
+    compress: str = "none",
+    resume: bool = False,
+    cache: bool = False,
+    cache_ttl_hours: float = 24,
+    concurrency: int = 20,
+    refresh_lookups: bool = False,
+    metrics_file: str = "",
+    grace: int = DEFAULT_GRACE_RUNS,
+):
+    if run_all:
+        args = [
+            f"--workers={workers}",
+            f"--concurrency={concurrency}",
+            f"--compress={compress}",
+            f"--cache-ttl-hours={cache_ttl_hours}",
+            f"--grace={grace}",
+        ]
+        flags = {
+            "--cleardb": cleardb,
+            "--ingestonly": ingestonly,
+            "--incremental": incremental,
+            "--resume": resume,
+            "--cache": cache,
+            "--refresh-lookups": refresh_lookups,
+        }
+        args += [flag for flag, enabled in flags.items() if enabled]
+        ingest_all(self, args, jobs, metrics_file)
+        return
+    if not name:
+        raise CommandError("Pass a scraper name (e.g. us.cary_nc) or --all")
+
+    metrics.reset()
+    run = ScrapeRun.objects.create(scraper=name, incremental=incremental)
+    # errors logged during this run are reported in run stats for --all
+    errors = ErrorCounter()
+    ingestion_logger = logging.getLogger("pdp.ingestion")
+    ingestion_logger.addHandler(errors)
+    try:
+        status = ingest_scraper(
+            self,
+            name,
+            cleardb=cleardb,
+            ingestonly=ingestonly,
+            workers=workers,
+            incremental=incremental,
+            compress=compress,
+            resume=resume,
+            cache=cache,
+            cache_ttl_hours=cache_ttl_hours,
+            concurrency=concurrency,
+            refresh_lookups=refresh_lookups,
+            grace=grace,
+        )
+    except BaseException:
+        # the exception itself hasn't been logged (yet), count it too
+        finish_run(run, RunStatus.FAILED, errors.count + 1)
+        raise
+    finally:
+        # otherwise every call_command("ingest") in a process leaves one behind
+        ingestion_logger.removeHandler(errors)
+    finish_run(run, status, errors.count)
+    invalidate_catalog()
+    if status != RunStatus.FAILED:
+        write_run_stats(run)
+    report_metrics(name, metrics_file)
+
+
+def ingest_scraper(
+    self,
+    name: str,
+    cleardb: bool,
+    ingestonly: bool,
+    workers: int,
+    incremental: bool,
+    compress: str,
+    resume: bool,
+    cache: bool,
+    cache_ttl_hours: float,
+    concurrency: int,
+    refresh_lookups: bool,
+    grace: int,
+) -> RunStatus:
+    """scrape (unless ingestonly) & load a single scraper, counts are recorded in metrics"""
+    num_saved = 0
+    # datasets seen upstream by this run are marked with a later last_seen_at
+    run_start = timezone.now()
+
     if cleardb:
         clear_db(name)
 
     if not ingestonly:
+        if compress not in STAGING_SUFFIXES:
+            self.secho(f"--compress must be one of {', '.join(STAGING_SUFFIXES)}", fg="red")
+            return RunStatus.FAILED
+
+        done_urls = load_checkpoint(name) if resume else set()
+        configure_cache(cache, ttl_seconds=cache_ttl_hours * 60 * 60)
+        configure_conditional_requests(incremental)
+        configure_lookups(refresh_lookups)
+
         # We have two potential strategies:
         #
         # 1) (preferred) list_datasets returns partial datasets
         #    which are then hydrated by get_dataset_details
         # 2) get_full_datasets returns fully-hydrated data sets
+        #
+        # either way, get_full_datasets() below yields (url, details) pairs
+        # where url is the PartialDataset url (if any) for checkpointing
+        #
+        # any of the three may be async, in which case they're run on an
+        # event loop with up to `concurrency` details requests in flight
         try:
             mod = importlib.import_module(f"ingestion.{name}")
+            configure_rate_limits(getattr(mod, "RATE_LIMITS", {}))
 
             if not hasattr(mod, "list_datasets") or not hasattr(mod, "get_dataset_details"):
                 # will raise AttributError if none of the 3 are found
-                get_full_datasets = mod.get_full_datasets
-            else:
-                # combine the two here for now, better logic TBD
+                full_datasets = mod.get_full_datasets
+                if inspect.isasyncgenfunction(full_datasets):
+                    full_datasets = run_async_generator(full_datasets)
+
                 def get_full_datasets():
-                    for pd in mod.list_datasets():
-                        # print(pd)
-                        yield mod.get_dataset_details(pd)
+                    for details in full_datasets():
+                        metrics.inc("datasets_listed")
+                        yield None, details
+
+                if incremental or resume:
+                    self.secho(
+                        "Module only has get_full_datasets, "
+                        "incremental & resume modes have no effect",
+                        fg="yellow",
+                    )
+                    done_urls = set()
+            else:
+                get_dataset_details = instrument_details(mod.get_dataset_details)
+                mod_list_datasets = mod.list_datasets
+                if inspect.isasyncgenfunction(mod_list_datasets):
+                    mod_list_datasets = run_async_generator(mod_list_datasets)
+
+                def list_datasets():
+                    partial_datasets = count_listed(mod_list_datasets())
+                    if done_urls:
+                        partial_datasets = skip_checkpointed(partial_datasets, done_urls)
+                    if incremental:
+                        partial_datasets = skip_unchanged(partial_datasets, name)
+                    yield from partial_datasets
+
+                if inspect.iscoroutinefunction(mod.get_dataset_details):
+                    get_full_datasets = run_async_generator(
+                        lambda: hydrate_async(list_datasets, get_dataset_details, concurrency)
+                    )
+
+                elif workers > 1:
+
+                    def get_full_datasets():
+                        yield from hydrate_concurrently(list_datasets, get_dataset_details, workers)
+
+                else:
+                    # combine the two here for now, better logic TBD
+                    def get_full_datasets():
+                        for pd in list_datasets():
+                            yield pd.url, get_dataset_details(pd)
 
         except ImportError as e:
             self.secho(f"Could not import: {e}", fg="red")
-            return
+            return RunStatus.FAILED
         except AttributeError:
             self.secho("""Module did not contain
                        list_datasets/get_dataset_details or get_full_datasets""")
+            return RunStatus.FAILED
 
-        prep_dir(name)
+        if done_urls:
+            self.secho(f"Resuming, skipping {len(done_urls)} checkpointed datasets", fg="blue")
+        else:
+            if resume:
+                self.secho("No checkpoint found, starting from scratch", fg="yellow")
+            prep_dir(name)
 
         self.secho(f"Running ingestion.{name}", fg="blue")
 
-        for details in get_full_datasets():
-            logger.info("details", detail=details)
-            # TODO: this should save the datasets to disk & then import them
-            if details is None:
-                continue
-            save_to_json(details, name)
+        start = time.monotonic()
+        try:
+            with StagingWriter(name, compress) as staging:
+                for url, details in get_full_datasets():
+                    if details is not None:
+                        staging.save(details)
+                        num_saved += 1
+                        metrics.inc("datasets_staged")
+                    else:
+                        metrics.inc("datasets_failed")
+                    staging.checkpoint(url)
+        except NotModified as e:
+            self.secho(f"{e} has not changed since the last run, nothing to ingest", fg="green")
+            return RunStatus.NOT_MODIFIED
+
+        elapsed = time.monotonic() - start
+        metrics.set("scrape_seconds", round(elapsed, 3))
+        self.secho(
+            f"Scraped {num_saved} datasets in {elapsed:.1f}s "
+            f"({num_saved / elapsed if elapsed else 0:.2f} datasets/sec)",
+            fg="green",
+        )
+
+    stats = ingest_to_db(name)
+    self.secho(
+        f"Datasets: {stats['inserted']} inserted, {stats['updated']} updated, "
+        f"{stats['unchanged']} unchanged ({stats['files_inserted']} new files) "
+        f"in {stats['seconds']}s",
+        fg="green",
+    )
+
+    # unchanged datasets are marked as seen when they're skipped, but a staged
+    # file from an earlier incremental run only has the changed ones
+    if ingestonly and incremental:
+        self.secho("Not reconciling, staged datasets may be incomplete", fg="yellow")
+    else:
+        num_withdrawn = reconcile(name, since=run_start, grace=grace)
+        if num_withdrawn:
+            self.secho(f"Withdrew {num_withdrawn} datasets missing upstream", fg="yellow")
+
+    if not ingestonly:
+        commit_validators()
+    return RunStatus.OK
+
+
+def report_metrics(name: str, metrics_file: str = ""):
+    """emit this run's metrics as a single log record & optionally a Prometheus textfile"""
+    logger.info("ingest metrics", scraper=name, **metrics.summary())
+    if metrics_file:
+        metrics.write_textfile(metrics_file, scraper=name)
+
+
+def instrument_details(get_dataset_details):
+    """
+    Wrap get_dataset_details to time each call and skip datasets that fail
+    UpstreamDataset validation instead of aborting the run.
+
+    Time spent in make_request (throttling & network) is recorded as
+    dataset_fetch_seconds, the rest of the call as dataset_parse_seconds.
+    """
+
+    def validation_failed(pd, error):
+        metrics.inc("validation_failures")
+        logger.error("dataset failed validation", url=pd.url, errors=error.errors())
+        return None
+
+    def observe(start, fetch_seconds):
+        metrics.observe("dataset_fetch_seconds", fetch_seconds)
+        metrics.observe("dataset_parse_seconds", time.monotonic() - start - fetch_seconds)
+
+    if inspect.iscoroutinefunction(get_dataset_details):
+
+        async def instrumented(pd):
+            start = time.monotonic()
+            with request_time() as fetch_seconds:
+                try:
+                    return await get_dataset_details(pd)
+                except ValidationError as e:
+                    return validation_failed(pd, e)
+                finally:
+                    observe(start, fetch_seconds[0])
+
+    else:
+
+        def instrumented(pd):
+            start = time.monotonic()
+            with request_time() as fetch_seconds:
+                try:
+                    return get_dataset_details(pd)
+                except ValidationError as e:
+                    return validation_failed(pd, e)
+                finally:
+                    observe(start, fetch_seconds[0])
+
+    return instrumented
+
+
+class ErrorCounter(logging.Handler):
+    """counts error (and worse) log records"""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def finish_run(run: ScrapeRun, status: RunStatus, errors: int):
+    """record the outcome & counts of a run, see ScrapeRun"""
+    run.status = status
+    run.finished_at = timezone.now()
+    run.duration_seconds = (run.finished_at - run.started_at).total_seconds()
+    run.listed = metrics.total("datasets_listed")
+    run.fetched = metrics.total("datasets_staged")
+    run.skipped = metrics.total("datasets_skipped")
+    run.failed = metrics.total("datasets_failed")
+    run.inserted = metrics.total("datasets_inserted")
+    run.updated = metrics.total("datasets_updated")
+    run.withdrawn = metrics.total("datasets_withdrawn")
+    run.requests = metrics.total("http_requests")
+    run.rate_limited = metrics.total("http_rate_limited")
+    run.bytes_downloaded = metrics.total("http_bytes")
+    run.errors = errors
+    run.metrics = metrics.summary()
+    run.save()
+
+
+def run_stats_path(name: str) -> str:
+    return os.path.join(set_dir_path(name), "run.json")
+
+
+def write_run_stats(run: ScrapeRun):
+    """record the outcome of a run, read back by ingest --all"""
+    os.makedirs(set_dir_path(run.scraper), exist_ok=True)
+    with open(run_stats_path(run.scraper), "w") as f:
+        json.dump(
+            {
+                "run_id": run.id,
+                "status": run.get_status_display().lower(),
+                "scraped": run.fetched,
+                "inserted": run.inserted,
+                "updated": run.updated,
+                "errors": run.errors,
+            },
+            f,
+        )
+
+
+def plan_lanes(scrapers: dict[str, set[str]]) -> list[list[str]]:
+    """
+    Group scrapers into lanes that can run in parallel.
+
+    Rate limits are enforced per process, so scrapers that declare a common
+    host go in the same lane & run one after another.
+    """
+    lanes = []
+    for name, hosts in sorted(scrapers.items()):
+        lane_hosts, lane_names = set(hosts), [name]
+        for other_hosts, other_names in [lane for lane in lanes if lane[0] & hosts]:
+            lanes.remove((other_hosts, other_names))
+            lane_hosts |= other_hosts
+            lane_names = other_names + lane_names
+        lanes.append((lane_hosts, lane_names))
+    return [names for _, names in lanes]
+
+
+def ingest_all(self, args: list[str], jobs: int = 0, metrics_file: str = ""):
+    """
+    Run every scraper in its own `manage.py ingest` process & summarize.
+
+    Up to `jobs` lanes (see plan_lanes) run at once, all of them by default.
+    Each process's output goes to _logs/ingest/<name>.log. With metrics_file,
+    each scraper writes its own textfile alongside it, e.g. ingest-oecd.prom.
+    """
+    scrapers = registry.discover()
+    for module in scrapers.values():
+        for problem in module.problems:
+            self.secho(f"{module.name}: {problem}", fg="yellow")
+    lanes = plan_lanes({name: module.hosts for name, module in scrapers.items()})
+    os.makedirs(ALL_LOG_DIR, exist_ok=True)
+    self.secho(
+        f"Running {sum(len(lane) for lane in lanes)} scrapers in {len(lanes)} lanes", fg="blue"
+    )
+
+    def scraper_args(name):
+        if not metrics_file:
+            return args
+        stem, ext = os.path.splitext(metrics_file)
+        return [*args, f"--metrics-file={stem}-{name}{ext}"]
+
+    def run_lane(names):
+        return [run_scraper_process(self, name, scraper_args(name)) for name in names]
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=jobs or len(lanes)) as pool:
+        results = [result for lane in pool.map(run_lane, lanes) for result in lane]
+    elapsed = time.monotonic() - start
+
+    table = Table(title=f"Ingested {len(results)} scrapers in {elapsed:.1f}s")
+    for column in ("Scraper", "Status", "Duration", "Datasets", "Errors", "Datasets/sec"):
+        table.add_column(column, justify="left" if column in ("Scraper", "Status") else "right")
+    for result in results:
+        table.add_row(
+            result["scraper"],
+            result["status"],
+            f"{result['seconds']:.1f}s",
+            str(result.get("scraped", 0)),
+            str(result.get("errors", 0)),
+            f"{result.get('scraped', 0) / result['seconds'] if result['seconds'] else 0:.2f}",
+        )
+    Console().print(table)
+
+    failed = [result["scraper"] for result in results if result["status"] == "failed"]
+    if failed:
+        raise CommandError(f"{len(failed)} scrapers failed: {', '.join(failed)}")
+
+
+def run_scraper_process(self, name: str, args: list[str]) -> dict:
+    """run `manage.py ingest name` as a subprocess, returning its run stats"""
+    if os.path.exists(run_stats_path(name)):
+        os.remove(run_stats_path(name))
+
+    self.secho(f"Starting {name}", fg="blue")
+    start = time.monotonic()
+    with open(os.path.join(ALL_LOG_DIR, f"{name}.log"), "w") as log:
+        proc = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / "manage.py"), "ingest", name, *args],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    elapsed = time.monotonic() - start
+
+    result = {"status": "failed", "errors": 0}
+    if proc.returncode == 0 and os.path.exists(run_stats_path(name)):
+        with open(run_stats_path(name)) as f:
+            result = json.load(f)
+    elif proc.returncode:
+        result["errors"] += 1
+    result.update(scraper=name, seconds=elapsed)
+    self.secho(
+        f"Finished {name}: {result['status']} in {elapsed:.1f}s",
+        fg="red" if result["status"] == "failed" else "green",
+    )
+    return result
+
+
+def count_listed(partial_datasets):
+    for pd in partial_datasets:
+        metrics.inc("datasets_listed")
+        yield pd
+
+
+def skip_checkpointed(partial_datasets, done_urls: set[str]):
+    """skip PartialDatasets that were already hydrated by an interrupted run"""
+    for pd in partial_datasets:
+        if pd.url not in done_urls:
+            yield pd
+        else:
+            metrics.inc("datasets_skipped")
+
+
+def skip_unchanged(partial_datasets, name: str):
+    """
+    Filter PartialDatasets down to those that are new or changed since they
+    were last ingested.
+
+    A dataset is unchanged if the listing's `last_updated` is no newer than
+    either the stored upstream_upload_time or the last time its details were
+    fetched, whether or not they'd changed. (Some portals list a modification
+    date that differs from the upload time on their detail pages, so
+    upstream_upload_time alone isn't enough.)
+    """
+    rows = DataSet.objects.filter(scraper=name).values_list(
+        "source_url", "upstream_upload_time", "last_fetched_at", "updated_at"
+    )
+    # rows ingested before last_fetched_at was recorded fall back to updated_at
+    known = {
+        url: max(upload_time, fetched_at or updated_at)
+        for url, upload_time, fetched_at, updated_at in rows
+    }
+    num_changed = num_skipped = 0
+    # skipped datasets are still upstream, mark them seen for reconcile()
+    skipped_urls = []
+
+    for pd in partial_datasets:
+        last_seen = known.get(pd.url)
+        if last_seen and pd.last_updated and as_datetime(pd.last_updated) <= last_seen:
+            num_skipped += 1
+            metrics.inc("datasets_skipped")
+            skipped_urls.append(pd.url)
+            if len(skipped_urls) >= INGEST_CHUNK_SIZE:
+                mark_seen(DataSet.objects.filter(scraper=name, source_url__in=skipped_urls))
+                skipped_urls = []
+            continue
+        num_changed += 1
+        yield pd
+
+    if skipped_urls:
+        mark_seen(DataSet.objects.filter(scraper=name, source_url__in=skipped_urls))
+    logger.info("incremental listing", changed=num_changed, skipped=num_skipped)
+
+
+def as_datetime(value: date | datetime) -> datetime:
+    """listings provide dates or naive datetimes, compare them in UTC"""
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, UTC)
+    return value
+
+
+def hydrate_concurrently(list_datasets, get_dataset_details, workers: int):
+    """
+    Feed list_datasets() into a pool of get_dataset_details calls.
+
+    At most `workers * 2` details are in flight at once, so listing doesn't
+    race ahead of hydration & memory stays flat. Rate limiting is still
+    enforced by ingestion.utils.make_request across all threads.
+
+    Yields (url, details) pairs in completion order.
+    """
+    max_pending = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        for pd in list_datasets():
+            pending[pool.submit(get_dataset_details, pd)] = pd
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future).url, future.result()
+        for future in as_completed(pending):
+            yield pending[future].url, future.result()
 
-    ingest_to_db(name)
+
+async def hydrate_async(list_datasets, get_dataset_details, concurrency: int):
+    """
+    Async counterpart of hydrate_concurrently for coroutine get_dataset_details.
+
+    list_datasets is a regular generator (async listings are bridged by
+    run_async_generator first), stepped in a thread so it can't block the loop.
+    At most `concurrency` details calls run at once.
+
+    Yields (url, details) pairs in completion order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results = asyncio.Queue(maxsize=concurrency)
+    done = object()
+
+    async def hydrate(pd):
+        try:
+            await results.put((pd.url, await get_dataset_details(pd)))
+        except Exception as e:
+            await results.put(e)
+        finally:
+            semaphore.release()
+
+    async def feed():
+        async with asyncio.TaskGroup() as tasks:
+            # listing errors (e.g. NotModified) are handed over here, raising
+            # them out of the TaskGroup would wrap them in an ExceptionGroup
+            try:
+                partial_datasets = iter(list_datasets())
+                while (pd := await asyncio.to_thread(next, partial_datasets, done)) is not done:
+                    await semaphore.acquire()
+                    tasks.create_task(hydrate(pd))
+            except Exception as e:
+                await results.put(e)
+                return
+        await results.put(done)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while (result := await results.get()) is not done:
+            if isinstance(result, Exception):
+                raise result
+            yield result
+    finally:
+        feeder.cancel()
+
+
+def run_async_generator(async_gen_func):
+    """
+    Wrap an async generator function so it can be iterated synchronously.
+
+    The generator runs on its own event loop in a background thread, handing
+    items over through a bounded queue so it can't race ahead of the consumer.
+    Exceptions (e.g. NotModified) are re-raised in the consuming thread.
+    """
+
+    def iterate(*args, **kwargs):
+        items = queue.Queue(maxsize=ASYNC_BUFFER_SIZE)
+        done = object()
+
+        async def produce():
+            loop = asyncio.get_running_loop()
+            try:
+                async for item in async_gen_func(*args, **kwargs):
+                    # put blocks when the consumer falls behind, keep it off the loop
+                    await loop.run_in_executor(None, items.put, (item, None))
+            except Exception as e:
+                items.put((done, e))
+            else:
+                items.put((done, None))
+
+        threading.Thread(target=asyncio.run, args=(produce(),), daemon=True).start()
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error:
+                    raise error
+                return
+            yield item
+
+    return iterate
 
 
 def clear_db(name: str):
     """resets db for specified scraper for development testing"""
     # if scraper dsets exist, delete them
     if DataSet.objects.filter(scraper=name).exists():
+        # deleted from the search index by search.remove_deleted_dataset
         DataSet.objects.filter(scraper=name).delete()
         logger.info(f"{name} datasets has been removed from the database.")
 
@@ -95,16 +727,112 @@ def prep_dir(name: str):
         logger.info(f"New directory {dir_path} has been created.")
 
 
-def save_to_json(updata: UpstreamDataset, name: str):
+def next_staging_path(name: str, compress: str = "none") -> str:
+    """
+    Path for a new staging file.
+
+    A fresh run writes datasets.jsonl, each resumed run adds another part
+    alongside it (datasets-2.jsonl, ...) so that a truncated compressed file
+    from the interrupted run is never appended to.
+    """
     dir_path = set_dir_path(name)
-    file_path = os.path.join(dir_path, f"{updata.upstream_id}.json")
-    json_upd = updata.model_dump_json()
-    json_upd_data = json.loads(json_upd)
+    part = len(glob.glob(os.path.join(dir_path, "datasets*.jsonl*"))) + 1
+    file_name = "datasets" if part == 1 else f"datasets-{part}"
+    return os.path.join(dir_path, f"{file_name}{STAGING_SUFFIXES[compress]}")
+
+
+def staging_part(file_path: str) -> int:
+    match = re.search(r"datasets-(\d+)\.jsonl", os.path.basename(file_path))
+    return int(match.group(1)) if match else 1
+
+
+def checkpoint_path(name: str) -> str:
+    return os.path.join(set_dir_path(name), "checkpoint.txt")
+
 
-    with open(file_path, "w") as f:
-        json.dump(json_upd_data, f)
-        logger.info(f"""Dataset {updata.upstream_id}
-                    saved to {name} directory.""")
+def load_checkpoint(name: str) -> set[str]:
+    try:
+        with open(checkpoint_path(name)) as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def open_staging(file_path: str, mode: str):
+    """
+    Open a JSONL staging file as text, (de)compressing based on the file suffix.
+    """
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, f"{mode}t", encoding="utf8")
+    elif file_path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("zstd staging requires the zstandard package") from e
+        return zstandard.open(file_path, f"{mode}t", encoding="utf8")
+    else:
+        return open(file_path, mode, encoding="utf8")
+
+
+def save_to_jsonl(updata: UpstreamDataset, staging):
+    """append one dataset to an open staging file, one JSON document per line"""
+    staging.write(updata.model_dump_json())
+    staging.write("\n")
+    logger.debug("dataset staged", upstream_id=updata.upstream_id)
+
+
+class StagingWriter:
+    """
+    Appends scraped datasets to a new staging file & checkpoints the
+    PartialDataset urls that have been hydrated so --resume can skip them.
+
+    Checkpointed urls are only written after the staging file has been
+    closed (completing any compressed frame), so the checkpoint never refers
+    to datasets that aren't safely on disk. At most CHECKPOINT_EVERY datasets
+    are re-fetched after a crash.
+
+    The staging file is only created once a dataset is saved, so resuming a
+    run with nothing left to fetch doesn't add an empty part. Once the scrape
+    finishes without an exception the checkpoint is removed, a later --resume
+    starts from scratch instead of skipping every dataset.
+    """
+
+    def __init__(self, name: str, compress: str = "none"):
+        self.file_path = next_staging_path(name, compress)
+        self.checkpoint_path = checkpoint_path(name)
+        self._pending_urls = []
+        self._staging = None
+        self._created = False
+
+    def save(self, updata: UpstreamDataset):
+        if self._staging is None:
+            self._staging = open_staging(self.file_path, "a" if self._created else "w")
+            self._created = True
+        save_to_jsonl(updata, self._staging)
+
+    def checkpoint(self, url: str | None):
+        if url is None:
+            return
+        self._pending_urls.append(url)
+        if len(self._pending_urls) >= CHECKPOINT_EVERY:
+            self._flush()
+
+    def _flush(self):
+        if self._staging is not None:
+            self._staging.close()
+            self._staging = None
+        with open(self.checkpoint_path, "a") as f:
+            f.writelines(f"{url}\n" for url in self._pending_urls)
+        self._pending_urls.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        # everything saved so far is complete, even if the scraper raised
+        self._flush()
+        if exc_type is None:
+            os.remove(self.checkpoint_path)
 
 
 def empty_dir(name: str):
@@ -122,96 +850,282 @@ def empty_dir(name: str):
             logger.info(f"Failed to delete file {filepath}", detail=e)
 
 
-def ingest_to_db(name: str):
-    incoming_datasets = load_incoming_ds(name)
-    incoming_ds_ids = set()
+def ingest_to_db(name: str) -> Counter:
+    """
+    Load staged datasets into the database in chunks.
 
-    # load in existing db entries for scraper into flattened set
-    db_entries = DataSet.objects.filter(scraper=name)
-    db_entries_ids = set(db_entries.values_list("upstream_id", flat=True))
+    Each chunk is written in a single transaction with a fixed number of
+    queries, regardless of how many datasets or files it contains.
 
-    for dataset in incoming_datasets:
-        # retrieve/create corresponding publisher obj for dataset in db
-        publisher, _ = Publisher.objects.get_or_create(
-            name=dataset["publisher_name"],
-            defaults={
-                "kind": PublisherKind.GOV_NATIONAL,  # will need to revisit this
-                "url": dataset["publisher_url"] or "",
-            },
-        )
+    Returns counts of inserted/updated/unchanged datasets & timings.
+    """
+    start = time.monotonic()
+    stats = Counter()
+
+    for chunk in batched(load_incoming_ds(name), INGEST_CHUNK_SIZE):
+        chunk_start = time.monotonic()
+        with transaction.atomic():
+            ingest_chunk(chunk, name, stats)
+        chunk_seconds = time.monotonic() - chunk_start
+        metrics.observe("db_write_seconds", chunk_seconds)
+        logger.info("ingested chunk", size=len(chunk), seconds=chunk_seconds)
 
-        # retrieve/create corresponding region obj for dataset in db
-        region, _ = Region.objects.get_or_create(
-            country_code=dataset["region_country_code"], name=dataset["region_name"]
+    stats["seconds"] = round(time.monotonic() - start, 2)
+    logger.info("ingest_to_db complete", scraper=name, **stats)
+    for key in ("inserted", "updated", "unchanged"):
+        metrics.set(f"datasets_{key}", stats[key])
+    metrics.set("files_inserted", stats["files_inserted"])
+    metrics.set("ingest_seconds", stats["seconds"])
+    return stats
+
+
+def mark_seen(datasets, fetched: bool = False) -> int:
+    """
+    record that datasets are (still) upstream, restoring any that were
+    withdrawn. `fetched` also records that their details were just loaded
+    """
+    now = timezone.now()
+    fields = {"last_fetched_at": now} if fetched else {}
+    return datasets.update(last_seen_at=now, missed_runs=0, withdrawn_at=None, **fields)
+
+
+def reconcile(name: str, since: datetime, grace: int) -> int:
+    """
+    Withdraw a scraper's datasets that have disappeared upstream.
+
+    Datasets not seen since `since` (the start of this run) have missed
+    another run, those that have missed more than `grace` consecutive runs
+    are marked withdrawn. Both are single UPDATEs, regardless of how many
+    datasets the scraper has.
+
+    Returns the number of datasets withdrawn.
+    """
+    active = DataSet.objects.active().filter(scraper=name)
+    if not active.filter(last_seen_at__gte=since).exists():
+        # an empty or broken listing shouldn't count against every dataset
+        logger.warning("no datasets seen upstream, not reconciling", scraper=name)
+        return 0
+
+    missed = active.filter(Q(last_seen_at__lt=since) | Q(last_seen_at__isnull=True))
+    with transaction.atomic():
+        num_missed = missed.update(missed_runs=F("missed_runs") + 1)
+        num_withdrawn = active.filter(missed_runs__gt=grace).update(withdrawn_at=timezone.now())
+
+    logger.info("reconciled", scraper=name, missed=num_missed, withdrawn=num_withdrawn)
+    metrics.set("datasets_missed", num_missed)
+    metrics.set("datasets_withdrawn", num_withdrawn)
+    return num_withdrawn
+
+
+def ingest_chunk(datasets: list[dict], name: str, stats: Counter):
+    publishers = resolve_publishers(datasets)
+    regions = resolve_regions(datasets)
+
+    # existing rows are looked up the same way update_or_create would
+    existing = {
+        (ds.publisher_id, ds.upstream_id): ds
+        for ds in DataSet.objects.filter(
+            publisher__in=publishers.values(),
+            upstream_id__in={dataset["upstream_id"] for dataset in datasets},
         )
+    }
+    to_create = {}
+    to_update = {}
+    unchanged = set()
+    identifier_kinds = {}
+    files = {}
+    now = timezone.now()
+
+    for dataset in datasets:
+        publisher = publishers[dataset["publisher_name"]]
+        region = regions[(dataset["region_country_code"], dataset["region_name"])]
+        key = (publisher.id, dataset["upstream_id"])
+        ds_values = {
+            "name": dataset["name"],
+            "description": dataset["description"],
+            "upstream_upload_time": as_datetime(parse_datetime(dataset["upstream_upload_time"])),
+            "start_date": dataset["start_date"] and parse_date(dataset["start_date"]),
+            "end_date": dataset["end_date"] and parse_date(dataset["end_date"]),
+            "region_id": region.id,
+            "source_url": dataset["source_url"],
+            "license": dataset["license"],
+            "tags": dataset["tags"],
+            "alternate_names": dataset["alternate_names"],
+            "alternate_descriptions": dataset["alternate_descriptions"],
+            "quality_score": -1,
+            "scraper": name,
+        }
+
+        if key in to_create:
+            # repeated within this chunk, last one wins like update_or_create
+            ds_obj = to_create[key]
+        elif key in existing:
+            ds_obj = existing[key]
+            if all(getattr(ds_obj, field) == value for field, value in ds_values.items()):
+                unchanged.add(key)
+            else:
+                ds_obj.updated_at = now
+                to_update[key] = ds_obj
+        else:
+            ds_obj = DataSet(publisher=publisher, upstream_id=dataset["upstream_id"])
+            to_create[key] = ds_obj
+
+        for field, value in ds_values.items():
+            setattr(ds_obj, field, value)
 
         # retrieve corresponding identifier kind objs for dataset in db
-        identifier_kinds = []
+        kinds = []
         for kind in dataset["identifier_kinds"]:
             identifier_kind = get_identifier_kind(kind)
 
             if identifier_kind:  # valid IdentifierKind
-                identifier_kinds.append(identifier_kind)
+                kinds.append(identifier_kind)
             else:  # invalid, skip
                 logger.warning(
                     f"""Identifier kind {kind} not recognized by system and will
                     be omitted. Please double check or ingest identifier kind into
                     system using addidentifier.py command."""
                 )
+        if kinds:
+            identifier_kinds[key] = kinds
 
-        ds_values = {
-            "name": dataset["name"],
-            "description": dataset["description"],
-            "upstream_upload_time": dataset["upstream_upload_time"],
-            "start_date": dataset["start_date"],
-            "end_date": dataset["end_date"],
-            "region": region,
-            "source_url": dataset["source_url"],
-            "upstream_id": dataset["upstream_id"],
-            "license": dataset["license"],
-            "quality_score": -1,
-            "scraper": name,
-        }
+        for file_json in dataset["files"]:
+            files.setdefault(file_json["url"], (key, file_json))
+
+    # a concurrent run may have inserted the same rows since they were looked
+    # up, those become updates (& primary keys are set either way)
+    DataSet.objects.bulk_create(
+        to_create.values(),
+        update_conflicts=True,
+        unique_fields=["publisher", "upstream_id"],
+        update_fields=DATASET_UPDATE_FIELDS,
+    )
+    DataSet.objects.bulk_update(to_update.values(), DATASET_UPDATE_FIELDS)
+    stats["inserted"] += len(to_create)
+    stats["updated"] += len(to_update)
+    stats["unchanged"] += len(unchanged - to_update.keys())
+    ds_objs = existing | to_create
+    # unchanged rows aren't written above, this records the fetch for them too
+    mark_seen(
+        DataSet.objects.filter(id__in=[ds_obj.id for ds_obj in ds_objs.values()]), fetched=True
+    )
+    index_datasets([ds_obj.id for ds_obj in (to_create | to_update).values()])
 
-        ds_obj, _ = DataSet.objects.update_or_create(
-            publisher=publisher,
-            upstream_id=dataset["upstream_id"],
-            defaults=ds_values,
+    # set IdentifierKinds, replacing only those that differ
+    through = DataSet.identifier_kinds.through
+    current_kinds = defaultdict(set)
+    for ds_id, kind_id in through.objects.filter(
+        dataset_id__in=[ds_objs[key].id for key in identifier_kinds]
+    ).values_list("dataset_id", "identifierkind_id"):
+        current_kinds[ds_id].add(kind_id)
+    changed_kinds = {
+        ds_objs[key].id: {kind.id for kind in kinds}
+        for key, kinds in identifier_kinds.items()
+        if {kind.id for kind in kinds} != current_kinds[ds_objs[key].id]
+    }
+    through.objects.filter(dataset_id__in=changed_kinds.keys()).delete()
+    through.objects.bulk_create(
+        through(dataset_id=ds_id, identifierkind_id=kind_id)
+        for ds_id, kind_ids in changed_kinds.items()
+        for kind_id in kind_ids
+    )
+
+    # files are matched on original_url, existing files are left alone
+    existing_urls = set(
+        DataSetFile.objects.filter(original_url__in=files.keys()).values_list(
+            "original_url", flat=True
+        )
+    )
+    new_files = [
+        DataSetFile(
+            dataset=ds_objs[key],
+            original_url=url,
+            url=url,
+            file_type=file_json["file_type"],
+            file_size_mb=file_json["file_size_mb"],
         )
+        for url, (key, file_json) in files.items()
+        if url not in existing_urls
+    ]
+    DataSetFile.objects.bulk_create(new_files, ignore_conflicts=True)
+    stats["files_inserted"] += len(new_files)
 
-        # set IdentifierKinds
-        if identifier_kinds:
-            ds_obj.identifier_kinds.set(identifier_kinds)
 
-        for file_json in dataset["files"]:
-            ds_file, _ = DataSetFile.objects.get_or_create(
-                original_url=file_json["url"],
-                defaults={
-                    "dataset": ds_obj,
-                    "url": file_json["url"],
-                    "file_type": file_json["file_type"],
-                    "file_size_mb": file_json["file_size_mb"],
-                },
+def resolve_publishers(datasets: list[dict]) -> dict[str, Publisher]:
+    """retrieve/create publisher objs for a chunk of datasets, keyed by name"""
+    publishers = {}
+    names = {dataset["publisher_name"] for dataset in datasets}
+    for publisher in Publisher.objects.filter(name__in=names):
+        publishers[publisher.name] = publisher
+
+    missing = {}
+    for dataset in datasets:
+        if dataset["publisher_name"] not in publishers:
+            missing.setdefault(
+                dataset["publisher_name"],
+                Publisher(
+                    name=dataset["publisher_name"],
+                    kind=PublisherKind.GOV_NATIONAL,  # will need to revisit this
+                    url=dataset["publisher_url"] or "",
+                ),
             )
+    # ignore_conflicts doesn't set primary keys, so read back what was created
+    # (or inserted concurrently by another run)
+    Publisher.objects.bulk_create(missing.values(), ignore_conflicts=True)
+    if missing:
+        publishers |= {
+            publisher.name: publisher for publisher in Publisher.objects.filter(name__in=missing)
+        }
 
-        incoming_ds_ids.add(dataset["upstream_id"])
+    return publishers
 
-    print("(Would be) Deleted record upstream_ids:")
-    for id in list(db_entries_ids - incoming_ds_ids):
-        print(id)
 
+def resolve_regions(datasets: list[dict]) -> dict[tuple[str, str], Region]:
+    """retrieve/create region objs for a chunk of datasets, keyed by (country_code, name)"""
+    keys = {(dataset["region_country_code"], dataset["region_name"]) for dataset in datasets}
+    regions = {}
+    names = {name for _, name in keys}
+    for region in Region.objects.filter(name__in=names):
+        regions[region.country_code, region.name] = region
 
-def load_incoming_ds(name: str):
-    file_path = os.path.join(set_dir_path(name), "*.json")
-    json_files = glob.glob(file_path)
-    incoming_datasets = []
+    missing = [
+        Region(country_code=country_code, name=name)
+        for country_code, name in keys
+        if (country_code, name) not in regions
+    ]
+    # as with publishers, read back created rows for their primary keys
+    Region.objects.bulk_create(missing, ignore_conflicts=True)
+    if missing:
+        for region in Region.objects.filter(name__in={region.name for region in missing}):
+            regions[region.country_code, region.name] = region
+
+    return regions
 
-    for json_file in json_files:
-        with open(json_file, "r") as f:
-            incoming_json = json.load(f)
-            incoming_datasets.append(incoming_json)
 
-    return incoming_datasets
+def load_incoming_ds(name: str):
+    """
+    Stream staged datasets back as dicts, one at a time.
+    """
+    staged_files = glob.glob(os.path.join(set_dir_path(name), "datasets*.jsonl*"))
+    if not staged_files:
+        logger.info(f"No staged datasets found for {name}")
+        return
+
+    # parts from resumed runs are read in the order they were written
+    for file_path in sorted(staged_files, key=staging_part):
+        try:
+            with open_staging(file_path, "r") as staging:
+                for line_number, line in enumerate(staging, 1):
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # most likely a partial line from an interrupted run
+                        logger.warning(
+                            "skipping invalid staged line", file=file_path, line=line_number
+                        )
+        except EOFError:
+            # compressed file from an interrupted run, everything before this is usable
+            logger.warning("staging file truncated", file=file_path)
 
 
 @cache
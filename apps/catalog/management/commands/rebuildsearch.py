@@ -0,0 +1,11 @@
+from django_typer.management import Typer
+from apps.catalog.search import rebuild_index
+
+app = Typer()
+
+
+@app.command()
+def command(self):
+    """Rebuild the full-text search index from every dataset."""
+    num_indexed = rebuild_index()
+    self.secho(f"Indexed {num_indexed} datasets", fg="green")
@@ -0,0 +1,30 @@
+from django_typer.management import Typer
+from django.core.management.base import CommandError
+from rich.console import Console
+from rich.table import Table
+from ingestion import registry
+
+app = Typer()
+
+
+@app.command()
+def command(self):
+    """List scraper modules & check them against the scraper protocol (without importing them)."""
+    scrapers = registry.discover()
+
+    table = Table(title=f"{len(scrapers)} scrapers")
+    for column in ("Scraper", "Strategy", "Async", "Rate limited hosts", "Problems"):
+        table.add_column(column)
+    for module in scrapers.values():
+        table.add_row(
+            module.name,
+            module.strategy or "-",
+            "yes" if module.is_async else "",
+            "\n".join(f"{host} ({limit}/min)" for host, limit in module.rate_limits.items()),
+            "\n".join(module.problems),
+        )
+    Console().print(table)
+
+    invalid = [module.name for module in scrapers.values() if module.problems]
+    if invalid:
+        raise CommandError(f"{len(invalid)} scrapers have problems: {', '.join(invalid)}")
@@ -0,0 +1,136 @@
+import statistics
+from typing import Annotated
+import typer
+from django_typer.management import Typer
+from rich.console import Console
+from rich.table import Table
+from apps.catalog.models import ScrapeRun, RunStatus
+
+app = Typer()
+
+
+@app.command()
+def command(
+    self,
+    scraper: Annotated[str | None, typer.Argument()] = None,
+    limit: int = 10,
+    slowdown: float = 2.0,
+):
+    """
+    Report recent ingest runs & throughput trends.
+
+    Without a scraper, shows each scraper's latest run compared to the median
+    of its previous `limit` successful runs, flagging runs that took at least
+    `slowdown` times as long or were rate limited. With a scraper, lists its
+    last `limit` runs.
+    """
+    if scraper:
+        runs = list(ScrapeRun.objects.filter(scraper=scraper).order_by("-started_at")[:limit])
+        if not runs:
+            self.secho(f"No runs recorded for {scraper}", fg="yellow")
+            return
+        Console().print(history_table(scraper, runs))
+        return
+
+    scrapers = ScrapeRun.objects.order_by("scraper").values_list("scraper", flat=True).distinct()
+    table = Table(title="Latest ingest runs")
+    for column in (
+        "Scraper",
+        "Started",
+        "Status",
+        "Duration",
+        "Datasets/sec",
+        "Median duration",
+        "Median datasets/sec",
+        "Change",
+        "429s",
+    ):
+        table.add_column(column, justify="left" if column in ("Scraper", "Status") else "right")
+
+    for name in scrapers:
+        latest, *previous = ScrapeRun.objects.filter(scraper=name).order_by("-started_at")[
+            : limit + 1
+        ]
+        baseline = [run for run in previous if run.status == RunStatus.OK and run.duration_seconds]
+        median_duration = (
+            statistics.median(run.duration_seconds for run in baseline) if baseline else None
+        )
+        median_rate = (
+            statistics.median(run.datasets_per_second() for run in baseline) if baseline else None
+        )
+        change = ""
+        style = None
+        if median_duration and latest.duration_seconds:
+            ratio = latest.duration_seconds / median_duration
+            change = f"{ratio:.1f}x"
+            if ratio >= slowdown:
+                style = "red"
+        if latest.status == RunStatus.FAILED or latest.rate_limited:
+            style = "red"
+
+        table.add_row(
+            name,
+            f"{latest.started_at:%Y-%m-%d %H:%M}",
+            latest.get_status_display(),
+            format_seconds(latest.duration_seconds),
+            f"{latest.datasets_per_second():.2f}",
+            format_seconds(median_duration),
+            f"{median_rate:.2f}" if median_rate is not None else "-",
+            change,
+            str(latest.rate_limited),
+            style=style,
+        )
+    Console().print(table)
+
+
+def history_table(scraper: str, runs: list[ScrapeRun]) -> Table:
+    table = Table(title=f"Recent {scraper} runs")
+    for column in (
+        "Started",
+        "Status",
+        "Duration",
+        "Listed",
+        "Fetched",
+        "Skipped",
+        "Failed",
+        "Inserted",
+        "Updated",
+        "Withdrawn",
+        "Requests",
+        "429s",
+        "Datasets/sec",
+    ):
+        table.add_column(column, justify="left" if column in ("Started", "Status") else "right")
+    for run in runs:
+        table.add_row(
+            f"{run.started_at:%Y-%m-%d %H:%M}",
+            run.get_status_display(),
+            format_seconds(run.duration_seconds),
+            *(
+                str(count)
+                for count in (
+                    run.listed,
+                    run.fetched,
+                    run.skipped,
+                    run.failed,
+                    run.inserted,
+                    run.updated,
+                    run.withdrawn,
+                    run.requests,
+                    run.rate_limited,
+                )
+            ),
+            f"{run.datasets_per_second():.2f}",
+            style="red" if run.status == RunStatus.FAILED else None,
+        )
+    return table
+
+
+def format_seconds(seconds: float | None) -> str:
+    if seconds is None:
+        return "-"
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}h"
+    if seconds >= 60:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds:.1f}s"
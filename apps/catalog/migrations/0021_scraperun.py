@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0020_alter_dataset_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScrapeRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("scraper", models.TextField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("ru", "Running"),
+                            ("ok", "OK"),
+                            ("nm", "Not Modified"),
+                            ("fa", "Failed"),
+                        ],
+                        default="ru",
+                        max_length=2,
+                    ),
+                ),
+                ("incremental", models.BooleanField(default=False)),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("duration_seconds", models.FloatField(blank=True, null=True)),
+                ("listed", models.IntegerField(default=0)),
+                ("fetched", models.IntegerField(default=0)),
+                ("skipped", models.IntegerField(default=0)),
+                ("failed", models.IntegerField(default=0)),
+                ("inserted", models.IntegerField(default=0)),
+                ("updated", models.IntegerField(default=0)),
+                ("deleted", models.IntegerField(default=0)),
+                ("requests", models.IntegerField(default=0)),
+                ("rate_limited", models.IntegerField(default=0)),
+                ("bytes_downloaded", models.BigIntegerField(default=0)),
+                ("errors", models.IntegerField(default=0)),
+                ("metrics", models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["scraper", "-started_at"], name="catalog_scr_scraper_e9f0f5_idx"
+                    )
+                ],
+            },
+        ),
+    ]
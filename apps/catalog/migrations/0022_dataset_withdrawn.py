@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0021_scraperun"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataset",
+            name="last_seen_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="dataset",
+            name="missed_runs",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="dataset",
+            name="withdrawn_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RenameField(
+            model_name="scraperun",
+            old_name="deleted",
+            new_name="withdrawn",
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(model, fields, foreign_keys=(), many_to_many=()):
+    """
+    Keep the lowest id of each group of rows sharing `fields`.
+
+    References from `foreign_keys` [(model, field name)] and through tables of
+    `many_to_many` [(through model, field name)] are moved to the kept row
+    before the rest are deleted.
+    """
+    groups = model.objects.values(*fields).annotate(keep=Min("id"), rows=Count("id"))
+    for group in list(groups.filter(rows__gt=1)):
+        keep = group.pop("keep")
+        del group["rows"]
+        duplicates = list(
+            model.objects.filter(**group).exclude(id=keep).values_list("id", flat=True)
+        )
+
+        for related, field in foreign_keys:
+            related.objects.filter(**{f"{field}_id__in": duplicates}).update(
+                **{f"{field}_id": keep}
+            )
+        for through, field in many_to_many:
+            # the other side of each relation, e.g. dataset_id for identifierkind
+            (other,) = [
+                f.attname
+                for f in through._meta.fields
+                if f.is_relation and f.attname != f"{field}_id"
+            ]
+            moved = through.objects.filter(**{f"{field}_id__in": duplicates})
+            others = set(moved.values_list(other, flat=True))
+            moved.delete()
+            through.objects.bulk_create(
+                [through(**{other: other_id, f"{field}_id": keep}) for other_id in others],
+                ignore_conflicts=True,
+            )
+        model.objects.filter(id__in=duplicates).delete()
+
+
+def dedupe(apps, schema_editor):
+    Publisher = apps.get_model("catalog", "Publisher")
+    Region = apps.get_model("catalog", "Region")
+    IdentifierKind = apps.get_model("catalog", "IdentifierKind")
+    Identifier = apps.get_model("catalog", "Identifier")
+    DataSet = apps.get_model("catalog", "DataSet")
+    DataSetFile = apps.get_model("catalog", "DataSetFile")
+    Comment = apps.get_model("ugc", "Comment")
+    ProjectDataSet = apps.get_model("ugc", "ProjectDataSet")
+
+    # publishers first, so their datasets are grouped together below
+    merge_duplicates(Publisher, ["name"], foreign_keys=[(DataSet, "publisher")])
+    merge_duplicates(Region, ["country_code", "name"], foreign_keys=[(DataSet, "region")])
+    merge_duplicates(
+        IdentifierKind,
+        ["kind"],
+        foreign_keys=[(Identifier, "identifier_kind")],
+        many_to_many=[(DataSet.identifier_kinds.through, "identifierkind")],
+    )
+    merge_duplicates(
+        DataSet,
+        ["publisher", "upstream_id"],
+        foreign_keys=[(DataSetFile, "dataset"), (Comment, "dataset"), (ProjectDataSet, "dataset")],
+        many_to_many=[
+            (DataSet.identifier_kinds.through, "dataset"),
+            (DataSet.curated_collections.through, "dataset"),
+        ],
+    )
+    merge_duplicates(DataSetFile, ["original_url"])
+
+
+# merges rows that would break the constraints added by 0023b. kept separate
+# from them: on Postgres the moved references leave deferred FK checks pending
+# & the tables can't be altered in the same transaction
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0022_dataset_withdrawn"),
+        ("ugc", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0023a_merge_duplicates"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="datasetfile",
+            name="original_url",
+            field=models.URLField(max_length=500, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="identifierkind",
+            name="kind",
+            field=models.TextField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name="publisher",
+            name="name",
+            field=models.TextField(unique=True),
+        ),
+        migrations.AddIndex(
+            model_name="dataset",
+            index=models.Index(fields=["scraper"], name="catalog_dat_scraper_ada3aa_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="dataset",
+            constraint=models.UniqueConstraint(
+                fields=("publisher", "upstream_id"), name="unique_dataset_upstream_id"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="region",
+            constraint=models.UniqueConstraint(
+                fields=("country_code", "name"), name="unique_region"
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:31
+
+from django.db import migrations, models
+
+# SQL is per-vendor, see apps.catalog.search
+CREATE_SEARCH_TABLE = {
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE catalog_dataset_search USING fts5(
+            name, tags, alternate_names, description, alternate_descriptions,
+            tokenize = 'porter unicode61 remove_diacritics 2'
+        )
+        """,
+        # weights for the rank column, in column order
+        """
+        INSERT INTO catalog_dataset_search (catalog_dataset_search, rank)
+        VALUES ('rank', 'bm25(10.0, 5.0, 5.0, 1.0, 1.0)')
+        """,
+        # existing datasets don't have tags or alternates yet
+        """
+        INSERT INTO catalog_dataset_search (rowid, name, tags, alternate_names, description,
+            alternate_descriptions)
+        SELECT id, name, '', '', description, '' FROM catalog_dataset
+        """,
+    ],
+    "postgresql": [
+        """
+        CREATE TABLE catalog_dataset_search (
+            dataset_id bigint PRIMARY KEY
+                REFERENCES catalog_dataset (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+            document tsvector NOT NULL
+        )
+        """,
+        """
+        CREATE INDEX catalog_dataset_search_document
+        ON catalog_dataset_search USING gin (document)
+        """,
+        """
+        INSERT INTO catalog_dataset_search (dataset_id, document)
+        SELECT id, setweight(to_tsvector('english', name), 'A')
+            || setweight(to_tsvector('english', description), 'C')
+        FROM catalog_dataset
+        """,
+    ],
+}
+
+
+def create_search_table(apps, schema_editor):
+    for sql in CREATE_SEARCH_TABLE[schema_editor.connection.vendor]:
+        schema_editor.execute(sql)
+
+
+def drop_search_table(apps, schema_editor):
+    schema_editor.execute("DROP TABLE catalog_dataset_search")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0023b_ingestion_constraints"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataset",
+            name="alternate_descriptions",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="dataset",
+            name="alternate_names",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="dataset",
+            name="tags",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
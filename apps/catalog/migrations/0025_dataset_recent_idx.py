@@ -0,0 +1,16 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0024_dataset_search"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="dataset",
+            index=models.Index(fields=["-upstream_upload_time", "-id"], name="dataset_recent_idx"),
+        ),
+    ]
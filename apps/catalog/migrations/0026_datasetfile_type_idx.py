@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0025_dataset_recent_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="datasetfile",
+            index=models.Index(
+                fields=["dataset", "file_type"], name="catalog_dat_dataset_5df7af_idx"
+            ),
+        ),
+    ]
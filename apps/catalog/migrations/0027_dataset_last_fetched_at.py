@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0026_datasetfile_type_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataset",
+            name="last_fetched_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
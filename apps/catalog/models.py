@@ -41,8 +41,15 @@ class TimePeriod(models.TextChoices):
     OTHER = "ot", _("Other")
 
 
+class RunStatus(models.TextChoices):
+    RUNNING = "ru", _("Running")
+    OK = "ok", _("OK")
+    NOT_MODIFIED = "nm", _("Not Modified")
+    FAILED = "fa", _("Failed")
+
+
 class Publisher(models.Model):
-    name = models.TextField()
+    name = models.TextField(unique=True)
     kind = models.CharField(max_length=2, choices=PublisherKind)
 
     url = models.URLField(max_length=500)
@@ -56,6 +63,11 @@ class Region(models.Model):
     name = models.TextField()
     country_code = models.CharField(max_length=2)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["country_code", "name"], name="unique_region"),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.country_code}"
 
@@ -96,7 +108,7 @@ class IdentifierKind(models.Model):
     Example: FIPS, ISO-3166
     """
 
-    kind = models.TextField()
+    kind = models.TextField(unique=True)
 
     def __str__(self):
         return self.kind
@@ -128,6 +140,12 @@ class Crosswalk(models.Model):
         return f"Crosswalk: {self.primary} - {self.secondary}"
 
 
+class DataSetQuerySet(models.QuerySet):
+    def active(self):
+        """datasets that haven't been withdrawn upstream"""
+        return self.filter(withdrawn_at__isnull=True)
+
+
 class DataSet(models.Model):
     """
     Fundamental unit of the catalog, a single data set.
@@ -137,6 +155,10 @@ class DataSet(models.Model):
 
     TODO: some data sets are static, but some may update periodically
           without creating a new release
+
+    Datasets that disappear upstream aren't deleted, once they've been
+    missing from more than `ingest --grace` consecutive runs of their
+    scraper they're marked withdrawn (see DataSet.objects.active()).
     """
 
     name = models.CharField(max_length=500)
@@ -153,6 +175,10 @@ class DataSet(models.Model):
     source_url = models.URLField(max_length=500)
     upstream_id = models.CharField(max_length=100)
     license = models.CharField(max_length=100)
+    # as collected upstream, alternates are lists of {"value", "lang", "note"}
+    tags = models.JSONField(default=list, blank=True)
+    alternate_names = models.JSONField(default=list, blank=True)
+    alternate_descriptions = models.JSONField(default=list, blank=True)
 
     # -- fields below this are populated after initial ingestion --
     temporal_collection = models.ForeignKey(
@@ -169,9 +195,31 @@ class DataSet(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     scraper = models.TextField(null=True)
+    # when ingest last loaded the dataset's details, incremental runs skip
+    # datasets whose listing hasn't changed since
+    last_fetched_at = models.DateTimeField(null=True, blank=True)
+    # maintained by ingest's reconciliation step
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    missed_runs = models.IntegerField(default=0)
+    withdrawn_at = models.DateTimeField(null=True, blank=True)
 
     identifier_kinds = models.ManyToManyField(IdentifierKind, blank=True, related_name="datasets")
 
+    objects = DataSetQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # ingest upserts on this
+            models.UniqueConstraint(
+                fields=["publisher", "upstream_id"], name="unique_dataset_upstream_id"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["scraper"]),
+            # default search & homepage ordering
+            models.Index(fields=["-upstream_upload_time", "-id"], name="dataset_recent_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name}: {self.start_date}-{self.end_date}"
 
@@ -185,13 +233,17 @@ class DataSetFile(models.Model):
     """
 
     dataset = models.ForeignKey(DataSet, on_delete=models.CASCADE, related_name="files")
-    original_url = models.URLField(max_length=500)
+    original_url = models.URLField(max_length=500, unique=True)
     url = models.URLField(max_length=500)
     mirrored_url = models.URLField(max_length=500, null=True)
     last_mirrored = models.DateTimeField(null=True)
     file_type = models.CharField(choices=FileType)
     file_size_mb = models.IntegerField()  # file size in megabytes
 
+    class Meta:
+        # search's file type filter & facet
+        indexes = [models.Index(fields=["dataset", "file_type"])]
+
     def file_type_and_size(self):
         """if size is 0, omit"""
         if self.file_size_mb:
@@ -203,4 +255,47 @@ class DataSetFile(models.Model):
         return f"{self.dataset.name} File: {self.file_type}, {self.file_size_mb} MB"
 
 
+class ScrapeRun(models.Model):
+    """
+    A single `manage.py ingest` run of one scraper, written by the ingest command.
+
+    Dataset counts: listed upstream, fetched (hydrated & staged), skipped as
+    unchanged/already checkpointed, failed to fetch or validate, and the
+    inserted/updated/withdrawn results of loading them.
+    """
+
+    scraper = models.TextField()
+    status = models.CharField(max_length=2, choices=RunStatus, default=RunStatus.RUNNING)
+    incremental = models.BooleanField(default=False)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True)
+
+    listed = models.IntegerField(default=0)
+    fetched = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    inserted = models.IntegerField(default=0)
+    updated = models.IntegerField(default=0)
+    withdrawn = models.IntegerField(default=0)
+
+    requests = models.IntegerField(default=0)
+    rate_limited = models.IntegerField(default=0)
+    bytes_downloaded = models.BigIntegerField(default=0)
+    errors = models.IntegerField(default=0)
+    # full ingestion.metrics summary for the run
+    metrics = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["scraper", "-started_at"])]
+
+    def datasets_per_second(self):
+        if not self.duration_seconds:
+            return 0
+        return self.fetched / self.duration_seconds
+
+    def __str__(self):
+        return f"{self.scraper} - {self.started_at:%Y-%m-%d %H:%M} ({self.get_status_display()})"
+
+
 # class GeoProjection(?)
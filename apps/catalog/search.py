@@ -0,0 +1,216 @@
+"""
+Full-text search over datasets.
+
+The index is a separate table keyed by dataset id (see migration 0024):
+an FTS5 virtual table on SQLite and a weighted tsvector with a GIN index on
+Postgres. Both index name, tags, alternate names, description & alternate
+descriptions, and rank name matches highest.
+
+`ingest` keeps the index up to date for the datasets it writes (bulk writes
+don't send signals), datasets saved or deleted one at a time (e.g. in the
+admin) are reindexed by the receivers below, which also invalidate the
+cached catalog stats & facets. `manage.py rebuildsearch` rebuilds it from
+scratch.
+"""
+
+import re
+from abc import ABC, abstractmethod
+from itertools import batched
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import DataSet
+from .stats import invalidate_catalog
+
+SEARCH_TABLE = "catalog_dataset_search"
+# in order of weight, see the bm25 weights in migration 0024 & PostgresSearch.WEIGHTS
+DOCUMENT_FIELDS = ("name", "tags", "alternate_names", "description", "alternate_descriptions")
+INDEX_BATCH_SIZE = 1000
+
+
+class SearchBackend(ABC):
+    """vendor-specific SQL for the search index"""
+
+    # column holding the dataset id
+    id_column = ""
+    # orders by the rank annotation, best match first
+    rank_order = ""
+
+    @abstractmethod
+    def match_param(self, query: str) -> str | None:
+        """`query` as the match parameter, None if there's nothing to search for"""
+
+    @abstractmethod
+    def match_condition(self) -> str:
+        """WHERE condition on SEARCH_TABLE rows matching the match parameter (%s)"""
+
+    @abstractmethod
+    def rank_sql(self) -> str:
+        """scalar subquery ranking the outer dataset row against the match parameter (%s)"""
+
+    @abstractmethod
+    def insert(self, cursor, rows: list[tuple]):
+        """rows are (id, *DOCUMENT_FIELDS) as text"""
+
+    def search(self, queryset, query: str):
+        param = self.match_param(query)
+        if param is None:
+            return queryset
+        matches = RawSQL(
+            f"SELECT {self.id_column} FROM {SEARCH_TABLE} WHERE {self.match_condition()}",
+            [param],
+        )
+        return (
+            queryset.filter(id__in=matches)
+            .annotate(rank=RawSQL(self.rank_sql(), [param]))
+            # id breaks ties so pages are stable
+            .order_by(self.rank_order, "-id")
+        )
+
+    def remove(self, cursor, dataset_ids: list[int]):
+        cursor.executemany(
+            f"DELETE FROM {SEARCH_TABLE} WHERE {self.id_column} = %s",
+            [(dataset_id,) for dataset_id in dataset_ids],
+        )
+
+    def clear(self, cursor):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+
+
+class SQLiteSearch(SearchBackend):
+    id_column = "rowid"
+    # bm25, lower is better
+    rank_order = "rank"
+
+    def match_param(self, query: str) -> str | None:
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return None
+        # quoted so that FTS5 query syntax in the input is matched as text,
+        # all terms must match
+        return " ".join(f'"{term}"' for term in terms)
+
+    def match_condition(self) -> str:
+        return f"{SEARCH_TABLE} MATCH %s"
+
+    def rank_sql(self) -> str:
+        # LIMIT -1 stops SQLite from flattening the matches into a MATCH per
+        # dataset, they're collected once & looked up by an automatic index
+        return f"""
+            SELECT matches.rank FROM (
+                SELECT rowid AS id, rank FROM {SEARCH_TABLE}
+                WHERE {self.match_condition()} LIMIT -1
+            ) matches
+            WHERE matches.id = {DataSet._meta.db_table}.id
+        """
+
+    def insert(self, cursor, rows: list[tuple]):
+        columns = ", ".join(DOCUMENT_FIELDS)
+        placeholders = ", ".join(["%s"] * len(DOCUMENT_FIELDS))
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES (%s, {placeholders})", rows
+        )
+
+
+class PostgresSearch(SearchBackend):
+    id_column = "dataset_id"
+    rank_order = "-rank"
+    WEIGHTS = "ABBCD"
+    TSQUERY = "websearch_to_tsquery('english', %s)"
+
+    def match_param(self, query: str) -> str | None:
+        return query if query.strip() else None
+
+    def match_condition(self) -> str:
+        return f"document @@ {self.TSQUERY}"
+
+    def rank_sql(self) -> str:
+        return f"""
+            SELECT ts_rank(document, {self.TSQUERY}) FROM {SEARCH_TABLE}
+            WHERE dataset_id = {DataSet._meta.db_table}.id
+        """
+
+    def insert(self, cursor, rows: list[tuple]):
+        document = " || ".join(
+            f"setweight(to_tsvector('english', %s), '{weight}')" for weight in self.WEIGHTS
+        )
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (dataset_id, document) VALUES (%s, {document})", rows
+        )
+
+    def clear(self, cursor):
+        cursor.execute(f"TRUNCATE {SEARCH_TABLE}")
+
+
+BACKENDS = {"sqlite": SQLiteSearch, "postgresql": PostgresSearch}
+
+
+def get_backend() -> SearchBackend:
+    return BACKENDS[connection.vendor]()
+
+
+def search_datasets(queryset, query: str):
+    """filter `queryset` to datasets matching `query`, most relevant first"""
+    return get_backend().search(queryset, query)
+
+
+def index_datasets(dataset_ids: list[int]):
+    """(re)index the given datasets, e.g. after they've been written by ingest"""
+    backend = get_backend()
+    for batch in batched(dataset_ids, INDEX_BATCH_SIZE):
+        with connection.cursor() as cursor:
+            backend.remove(cursor, batch)
+            backend.insert(cursor, document_rows(DataSet.objects.filter(id__in=batch)))
+
+
+def remove_datasets(dataset_ids: list[int]):
+    """drop datasets from the index, SQLite can't cascade deletes to it"""
+    backend = get_backend()
+    for batch in batched(dataset_ids, INDEX_BATCH_SIZE):
+        with connection.cursor() as cursor:
+            backend.remove(cursor, batch)
+
+
+def rebuild_index() -> int:
+    """reindex every dataset, returns how many were indexed"""
+    backend = get_backend()
+    datasets = DataSet.objects.values_list("id", *DOCUMENT_FIELDS).iterator(
+        chunk_size=INDEX_BATCH_SIZE
+    )
+    num_indexed = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        backend.clear(cursor)
+        for batch in batched(datasets, INDEX_BATCH_SIZE):
+            backend.insert(cursor, [document_row(row) for row in batch])
+            num_indexed += len(batch)
+    return num_indexed
+
+
+@receiver(post_save, sender=DataSet)
+def index_saved_dataset(sender, instance, **kwargs):
+    index_datasets([instance.id])
+    invalidate_catalog()
+
+
+@receiver(post_delete, sender=DataSet)
+def remove_deleted_dataset(sender, instance, **kwargs):
+    remove_datasets([instance.id])
+    invalidate_catalog()
+
+
+def document_rows(queryset) -> list[tuple]:
+    return [document_row(row) for row in queryset.values_list("id", *DOCUMENT_FIELDS)]
+
+
+def document_row(row: tuple) -> tuple:
+    """(id, name, tags, ...) as stored to (id, *text) for the index"""
+    dataset_id, name, tags, alternate_names, description, alternate_descriptions = row
+    return (
+        dataset_id,
+        name,
+        " ".join(tags),
+        " ".join(alt["value"] for alt in alternate_names),
+        description,
+        " ".join(alt["value"] for alt in alternate_descriptions),
+    )
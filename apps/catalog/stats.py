@@ -0,0 +1,84 @@
+"""
+Cached catalog statistics for the homepage.
+
+Counts, recent datasets & featured publishers only change when an ingest run
+writes to the catalog, so they're cached (see CACHES in settings) & keyed by
+catalog_version(). Finishing an ingest run changes the version, the new
+version is picked up within CATALOG_VERSION_SECONDS, or immediately when the
+cache is shared with ingest (a file or database cache). Saving or deleting a
+dataset (e.g. in the admin) changes it right away, in every process sharing
+the cache.
+"""
+
+import time
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from .models import DataSet, Publisher, ScrapeRun
+
+STATS_CACHE_SECONDS = 24 * 60 * 60
+CATALOG_VERSION_KEY = "catalog-version"
+CATALOG_VERSION_SECONDS = 60
+# set by invalidate_catalog, part of catalog_version
+CATALOG_EDITED_KEY = "catalog-edited"
+NUM_RECENT_DATASETS = 10
+NUM_FEATURED_PUBLISHERS = 10
+
+
+def catalog_stats() -> dict:
+    """
+    {"num_datasets", "num_publishers", "recent_datasets", "featured_publishers"}
+
+    Datasets & publishers are dicts of the fields the templates show.
+    """
+    return cache.get_or_set(
+        f"catalog-stats:{catalog_version()}", compute_catalog_stats, STATS_CACHE_SECONDS
+    )
+
+
+def compute_catalog_stats() -> dict:
+    active = DataSet.objects.active()
+    return {
+        "num_datasets": active.count(),
+        "num_publishers": Publisher.objects.count(),
+        "recent_datasets": list(
+            active.order_by("-upstream_upload_time", "-id").values(
+                "id", "name", "upstream_upload_time"
+            )[:NUM_RECENT_DATASETS]
+        ),
+        # publishers with the most datasets
+        "featured_publishers": list(
+            Publisher.objects.annotate(
+                num_datasets=Count("dataset", filter=Q(dataset__withdrawn_at__isnull=True))
+            )
+            .order_by("-num_datasets", "name")
+            .values("name", "url", "kind", "num_datasets")[:NUM_FEATURED_PUBLISHERS]
+        ),
+    }
+
+
+def catalog_version() -> str:
+    """
+    Changes whenever an ingest run finishes or the catalog is invalidated,
+    for cache keys.
+
+    Ingest runs in its own process, so the version is read from the database
+    (at most every CATALOG_VERSION_SECONDS) rather than relying on ingest to
+    clear a possibly per-process cache.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        finished = ScrapeRun.objects.filter(finished_at__isnull=False)
+        version = finished.aggregate(Max("id"))["id__max"] or 0
+        cache.set(CATALOG_VERSION_KEY, version, CATALOG_VERSION_SECONDS)
+    return f"{version}.{cache.get(CATALOG_EDITED_KEY, 0)}"
+
+
+def invalidate_catalog():
+    """
+    called by ingest & whenever a dataset is saved or deleted (see search.py),
+    so cached stats & facets are recomputed on their next use
+    """
+    cache.delete(CATALOG_VERSION_KEY)
+    # a timestamp rather than a counter, an evicted counter would restart &
+    # could bring back stale entries
+    cache.set(CATALOG_EDITED_KEY, time.time_ns(), None)
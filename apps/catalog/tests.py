@@ -1,3 +1,307 @@
-from django.test import TestCase
+import os
+import logging
+import sys
+import tempfile
+from datetime import datetime, timedelta, UTC
+from types import ModuleType
+from unittest import mock
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from apps.catalog.management.commands.ingest import hydrate_async, run_async_generator
+from django.utils import timezone
+from apps.catalog.models import DataSet, Publisher, PublisherKind, Region, RunStatus, ScrapeRun
+from apps.catalog.facets import catalog_facets, facet_counts
+from apps.catalog.search import search_datasets
+from apps.catalog.stats import catalog_stats
+from ingestion import registry
+from ingestion.data_models import PartialDataset, UpstreamDataset
+from ingestion.utils import NotModified
 
-# Create your tests here.
+
+def listing(error, num_datasets=0):
+    """a listing that raises `error` after yielding `num_datasets`"""
+
+    def list_datasets():
+        for i in range(num_datasets):
+            yield PartialDataset(f"https://example.com/{i}", None)
+        raise error
+
+    return list_datasets
+
+
+async def get_dataset_details(pd):
+    return {"url": pd.url}
+
+
+class HydrateAsyncTests(SimpleTestCase):
+    def hydrate(self, list_datasets):
+        return list(run_async_generator(hydrate_async)(list_datasets, get_dataset_details, 2))
+
+    def test_not_modified_is_raised_as_is(self):
+        with self.assertRaises(NotModified):
+            self.hydrate(listing(NotModified("https://example.com/catalog.csv")))
+
+    def test_listing_error_after_datasets(self):
+        with self.assertRaisesMessage(ValueError, "bad listing"):
+            self.hydrate(listing(ValueError("bad listing"), num_datasets=3))
+
+    def test_listing_error_keeps_its_type(self):
+        with self.assertRaisesMessage(ValueError, "bad listing"):
+            self.hydrate(listing(ValueError("bad listing")))
+
+    def test_yields_details(self):
+        def list_datasets():
+            for i in range(5):
+                yield PartialDataset(f"https://example.com/{i}", None)
+
+        results = self.hydrate(list_datasets)
+        self.assertCountEqual(
+            [url for url, _ in results], [f"https://example.com/{i}" for i in range(5)]
+        )
+
+
+class IngestAsyncScraperTests(TestCase):
+    def ingest(self, error):
+        scraper = ModuleType("ingestion.test_async")
+        scraper.list_datasets = listing(error)
+        scraper.get_dataset_details = get_dataset_details
+        cwd = os.getcwd()
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            mock.patch.dict(sys.modules, {"ingestion.test_async": scraper}),
+        ):
+            # staging files are written under the working directory
+            os.chdir(tmp)
+            try:
+                call_command("ingest", "test_async", "--incremental")
+            finally:
+                os.chdir(cwd)
+
+    def test_not_modified_run(self):
+        self.ingest(NotModified("https://example.com/catalog.csv"))
+        run = ScrapeRun.objects.get(scraper="test_async")
+        self.assertEqual(run.status, RunStatus.NOT_MODIFIED)
+
+    def test_listing_error_fails_run(self):
+        with self.assertRaisesMessage(ValueError, "bad listing"):
+            self.ingest(ValueError("bad listing"))
+        run = ScrapeRun.objects.get(scraper="test_async")
+        self.assertEqual(run.status, RunStatus.FAILED)
+
+    def test_error_counter_is_removed(self):
+        handlers = list(logging.getLogger("pdp.ingestion").handlers)
+        self.ingest(NotModified("https://example.com/catalog.csv"))
+        with self.assertRaises(ValueError):
+            self.ingest(ValueError("bad listing"))
+        self.assertEqual(logging.getLogger("pdp.ingestion").handlers, handlers)
+
+
+class IngestScraperTests(TestCase):
+    """runs `ingest` against a fake scraper listing self.upstream"""
+
+    def setUp(self):
+        # {upstream id: (name, last updated)}
+        self.upstream = {
+            str(i): (f"Dataset {i}", datetime(2025, 1, 1, tzinfo=UTC)) for i in range(3)
+        }
+        self.fetched = []
+        self.fail_on = None
+
+        scraper = ModuleType("ingestion.test_scraper")
+        scraper.list_datasets = self.list_datasets
+        scraper.get_dataset_details = self.get_dataset_details
+        modules = mock.patch.dict(sys.modules, {"ingestion.test_scraper": scraper})
+        modules.start()
+        self.addCleanup(modules.stop)
+
+        # staging files are written under the working directory
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp.name)
+
+    def list_datasets(self):
+        for upstream_id, (_, last_updated) in self.upstream.items():
+            yield PartialDataset(f"https://example.com/{upstream_id}", last_updated)
+
+    def get_dataset_details(self, pd):
+        upstream_id = pd.url.rsplit("/", 1)[1]
+        if upstream_id == self.fail_on:
+            raise RuntimeError("connection reset")
+        self.fetched.append(upstream_id)
+        name, last_updated = self.upstream[upstream_id]
+        return UpstreamDataset(
+            name=name,
+            description="",
+            upstream_upload_time=last_updated,
+            publisher_name="Parks",
+            region_name="Cary",
+            region_country_code="US",
+            source_url=pd.url,
+            upstream_id=upstream_id,
+        )
+
+    def ingest(self, *args):
+        self.fetched = []
+        call_command("ingest", "test_scraper", *args)
+        return ScrapeRun.objects.filter(scraper="test_scraper").latest("id")
+
+    def test_insert(self):
+        run = self.ingest()
+        self.assertEqual((run.status, run.inserted, run.updated), (RunStatus.OK, 3, 0))
+        self.assertEqual(
+            sorted(DataSet.objects.values_list("name", flat=True)),
+            ["Dataset 0", "Dataset 1", "Dataset 2"],
+        )
+
+    def test_update_and_unchanged(self):
+        self.ingest()
+        run = self.ingest()
+        self.assertEqual((run.inserted, run.updated, run.metrics["datasets_unchanged"]), (0, 0, 3))
+
+        self.upstream["1"] = ("Renamed", datetime.now(UTC) + timedelta(days=1))
+        run = self.ingest("--incremental")
+        # unchanged datasets aren't fetched at all
+        self.assertEqual(self.fetched, ["1"])
+        self.assertEqual((run.skipped, run.updated), (2, 1))
+        self.assertEqual(DataSet.objects.get(upstream_id="1").name, "Renamed")
+
+    def test_withdrawn_after_grace(self):
+        self.ingest()
+        del self.upstream["2"]
+        self.ingest("--grace=1")
+        self.assertIsNone(DataSet.objects.get(upstream_id="2").withdrawn_at)
+
+        run = self.ingest("--grace=1")
+        self.assertEqual(run.withdrawn, 1)
+        self.assertEqual(DataSet.objects.active().count(), 2)
+
+        # restored once it's listed again
+        self.upstream["2"] = ("Dataset 2", datetime(2025, 1, 1, tzinfo=UTC))
+        self.ingest("--grace=1")
+        self.assertEqual(DataSet.objects.active().count(), 3)
+
+    def test_resume(self):
+        self.fail_on = "2"
+        with self.assertRaisesMessage(RuntimeError, "connection reset"):
+            self.ingest()
+        self.assertEqual(ScrapeRun.objects.get().status, RunStatus.FAILED)
+
+        self.fail_on = None
+        run = self.ingest("--resume")
+        # only the dataset the interrupted run didn't get to is fetched
+        self.assertEqual(self.fetched, ["2"])
+        self.assertEqual((run.status, run.skipped, run.inserted), (RunStatus.OK, 2, 3))
+        self.assertFalse(os.path.exists("ingest_json/test_scraper/checkpoint.txt"))
+
+
+class RegistryTests(SimpleTestCase):
+    def problems(self, source):
+        with tempfile.NamedTemporaryFile("w", suffix=".py") as f:
+            f.write(source + "\ndef get_full_datasets():\n    pass\n")
+            f.flush()
+            return registry.scan_module("test_scraper", f.name).problems
+
+    def test_cheap_import_time_calls_are_allowed(self):
+        source = "import re, threading\nPATTERN = re.compile('x')\nLOCK = threading.Lock()"
+        self.assertEqual(self.problems(source), [])
+
+    def test_other_import_time_calls_are_flagged(self):
+        problems = self.problems("import re\nPATTERN = re.compile(fetch_codes())")
+        self.assertEqual(len(problems), 1)
+        self.assertIn("fetch_codes()", problems[0])
+
+
+class SearchIndexTests(TestCase):
+    """runs against whichever backend DATABASE_URL selects (SQLite or Postgres)"""
+
+    def setUp(self):
+        self.dataset = DataSet.objects.create(
+            name="Street tree inventory",
+            description="Location & species of trees",
+            upstream_upload_time=timezone.now(),
+            publisher=Publisher.objects.create(
+                name="Parks", kind=PublisherKind.GOV_LOCAL, url="https://example.com"
+            ),
+            region=Region.objects.create(name="Cary", country_code="US"),
+            source_url="https://example.com/trees",
+            upstream_id="trees",
+            license="CC0",
+        )
+
+    def search(self, query):
+        return list(search_datasets(DataSet.objects.all(), query).values_list("id", flat=True))
+
+    def test_saved_dataset_is_indexed(self):
+        self.assertEqual(self.search("trees"), [self.dataset.id])
+
+    def test_edited_dataset_is_reindexed(self):
+        self.dataset.name = "Sidewalk inventory"
+        self.dataset.tags = ["pavement"]
+        self.dataset.save()
+        self.assertEqual(self.search("sidewalk"), [self.dataset.id])
+        self.assertEqual(self.search("pavement"), [self.dataset.id])
+        self.assertEqual(self.search("street"), [])
+
+    def test_deleted_dataset_is_removed(self):
+        self.dataset.delete()
+        self.assertEqual(self.search("trees"), [])
+
+    def test_name_ranks_above_description(self):
+        other = DataSet.objects.get(id=self.dataset.id)
+        other.pk = None
+        other.name = "Species list"
+        other.description = "Street trees"
+        other.upstream_id = "species"
+        other.save()
+        self.assertEqual(self.search("street"), [self.dataset.id, other.id])
+
+    def test_facets_of_search_results(self):
+        results = search_datasets(DataSet.objects.all(), "trees").filter(region__country_code="US")
+        facets = facet_counts(results)
+        self.assertEqual([(f.value, f.count) for f in facets["region"]], [("US", 1)])
+        self.assertEqual(results.count(), 1)
+
+
+class CatalogCacheTests(TestCase):
+    def test_edits_invalidate_stats_and_facets(self):
+        publisher = Publisher.objects.create(
+            name="Parks", kind=PublisherKind.GOV_LOCAL, url="https://example.com"
+        )
+        self.assertEqual(catalog_stats()["num_datasets"], 0)
+        dataset = DataSet.objects.create(
+            name="Street tree inventory",
+            upstream_upload_time=timezone.now(),
+            publisher=publisher,
+            region=Region.objects.create(name="Cary", country_code="US"),
+            source_url="https://example.com/trees",
+            upstream_id="trees",
+            license="CC0",
+        )
+        self.assertEqual(catalog_stats()["num_datasets"], 1)
+        self.assertEqual([f.value for f in catalog_facets()["region"]], ["US"])
+        dataset.delete()
+        self.assertEqual(catalog_stats()["num_datasets"], 0)
+        self.assertEqual(catalog_facets()["region"], [])
+
+
+# templates render without collectstatic's manifest
+@override_settings(
+    STORAGES={"staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}
+)
+class SearchViewTests(TestCase):
+    def test_limit_is_clamped(self):
+        for limit in ("0", "-5", "1000", "x"):
+            with self.subTest(limit=limit):
+                response = self.client.get("/search/", {"limit": limit})
+                self.assertEqual(response.status_code, 200)
+
+    def test_invalid_collection_is_ignored(self):
+        response = self.client.get("/search/", {"collection": ["abc", "1", "²", "9" * 30]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["n_results"], 0)
+
+    def test_search_with_filters(self):
+        response = self.client.get("/search/", {"query": "trees", "region": "US", "pubtype": "gl"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["n_results"], 0)
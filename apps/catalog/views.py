@@ -1,9 +1,35 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 from django.core.paginator import Paginator
-from .models import DataSet, Publisher, Region, DataSetFile
+from .models import DataSet, DataSetFile
+from .search import search_datasets
+from .facets import catalog_facets, facet_counts
+from .stats import catalog_stats
 from urllib.parse import urlparse
 
+# columns needed to render a search result, see search.html
+SEARCH_RESULT_FIELDS = (
+    "name",
+    "upstream_upload_time",
+    "publisher__name",
+    "publisher__kind",
+    "region__name",
+    "region__country_code",
+)
+DEFAULT_SEARCH_PAGE_SIZE = 11
+MAX_SEARCH_PAGE_SIZE = 100
+# parameters that narrow search results (vs. page, limit)
+SEARCH_FILTERS = (
+    "query",
+    "PublisherName",
+    "CollectionName",
+    "pubtype",
+    "region",
+    "license",
+    "collection",
+    "filetype",
+)
+
 
 def index(request):
     # this view is intended as a simple demonstration of how to write a view
@@ -16,9 +42,10 @@ def index(request):
     # quite a simple one
     #
     # these variables become available in the template's {{ }} and {% %} blocks
+    stats = catalog_stats()
     context = {
-        "num_datasets": DataSet.objects.count(),
-        "num_publishers": Publisher.objects.count(),
+        "num_datasets": stats["num_datasets"],
+        "num_publishers": stats["num_publishers"],
     }
 
     # just to demonstrate, here is how you would obtain a parameter from the
@@ -41,12 +68,8 @@ def index(request):
 
 
 def homepage(request):
-    context = {
-        "recent_datasets": DataSet.objects.all().order_by("-upstream_upload_time")[:10],
-        "featured_publishers": Publisher.objects.all()[:10],
-        "num_datasets": DataSet.objects.count(),
-        "num_publishers": Publisher.objects.count(),
-    }
+    # cached until the next ingest, see stats.py
+    context = catalog_stats().copy()
 
     context["name"] = request.GET.get("name", "anonymous user")
 
@@ -71,7 +94,7 @@ def dataset_detail(request, dataset_id):
         "ds": ds,
         "files": DataSetFile.objects.filter(dataset__id=dataset_id),
         "collections": [collection for collection in ds.curated_collections.all()],
-        # "tags": ds.tags,
+        "tags": ds.tags,
         "tabs": tabs,
     }
 
@@ -80,96 +103,80 @@ def dataset_detail(request, dataset_id):
 
 def search(request):
     qd = request.GET.lists()
-    print(qd)
 
     # outstanding issues
-    # multiword search
     # should search funnel?
-    # trying to connect datasets to filetypes
     # clear button
     # advsearch currently resets, handle like searchbar
     # page display
     # defaults to showing all datasets if hit search page without query
 
-    result_dsets = DataSet.objects.all()
-
-    # if query:
-    #     result_dsets = dsets.filter(Q(name__icontains=query) | Q(description__icontains=query))
-    #     display_dsets = list(result_dsets)
+    result_dsets = DataSet.objects.active()
 
+    # most recent first, unless ranked by a query below
+    result_dsets = result_dsets.order_by("-upstream_upload_time", "-id")
+    # every filter narrows the same query, multi-valued filters (files &
+    # curated collections) use EXISTS so datasets aren't repeated
     for k, v in qd:
+        v = [value.strip() for value in v if value.strip()]
+        if not v:
+            continue
         if k == "query":
+            # ranked by relevance, see search.py
+            result_dsets = search_datasets(result_dsets, v[0])
+        elif k == "PublisherName":
+            result_dsets = result_dsets.filter(publisher__name__icontains=v[0])
+        elif k == "CollectionName":
+            curated = DataSet.curated_collections.through.objects.filter(
+                dataset_id=OuterRef("pk"), curatedcollection__name__icontains=v[0]
+            )
             result_dsets = result_dsets.filter(
-                Q(name__icontains=v[0]) | Q(description__icontains=v[0])
+                Q(temporal_collection__name__icontains=v[0]) | Exists(curated)
             )
-        elif k == "PublisherName" and v[0]:
-            pid = Publisher.objects.get(name__icontains=v[0]).id
-            result_dsets = result_dsets.filter(publisherid=pid)
         elif k == "pubtype":
-            q = Q()
-            for pt in v:
-                print("pt", pt)
-                q |= Q(kind=pt)
-                print("Q", q)
-            pubids = list(Publisher.objects.filter(q).values_list("id", flat=True).distinct())
-            print(pubids)
-            q = Q()
-            for id in pubids:
-                q |= Q(publisher_id=id)
-            result_dsets = result_dsets.filter(q)
+            result_dsets = result_dsets.filter(publisher__kind__in=v)
         elif k == "region":
-            regionids = [Region.objects.get(country_code=r).id for r in v]
-            q = Q()
-            for id in regionids:
-                q |= Q(region_id=id)
-            result_dsets = result_dsets.filter(q)
+            result_dsets = result_dsets.filter(region__country_code__in=v)
+        elif k == "license":
+            result_dsets = result_dsets.filter(license__in=v)
+        elif k == "collection":
+            # ids, anything else (or too big for the column) can't match a collection
+            ids = [value for value in v if value.isascii() and value.isdigit() and len(value) < 19]
+            result_dsets = result_dsets.filter(temporal_collection_id__in=ids)
         elif k == "filetype":
-            continue
-        else:
-            continue
-
-    display_dsets = list(result_dsets)
-    n_results = result_dsets.count()
-
-    limit = int(request.GET.get("limit", 11))
-
-    # if query:
-    #     result_dsets = dsets.filter(Q(name__icontains=query) | Q(description__icontains=query))
-    #     display_dsets = list(result_dsets)
-    #     n_results = result_dsets.count()
-
-    paginator = Paginator(display_dsets, limit)
+            files = DataSetFile.objects.filter(dataset_id=OuterRef("pk"), file_type__in=v)
+            result_dsets = result_dsets.filter(Exists(files))
+
+    # the paginator runs a COUNT & fetches one page with LIMIT/OFFSET, only
+    # the columns the template shows are loaded
+    try:
+        limit = int(request.GET.get("limit", DEFAULT_SEARCH_PAGE_SIZE))
+    except ValueError:
+        limit = DEFAULT_SEARCH_PAGE_SIZE
+    limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
+    paginator = Paginator(
+        result_dsets.select_related("publisher", "region").only(*SEARCH_RESULT_FIELDS), limit
+    )
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
+    n_results = paginator.count
 
-    geoids = list(result_dsets.values_list("region", flat=True).distinct())
-
-    geographies = []
-    for id in geoids:
-        geographies.append(Region.objects.get(id=id).country_code)
-    geographies = sorted(geographies)
-
-    ftypes = list(DataSetFile.objects.values_list("file_type", flat=True).distinct())
-    ftypes = sorted(ftypes)
-
-    print(request.get_full_path())
+    # counts for the whole catalog are cached
+    filtered = any(any(v) for k, v in request.GET.lists() if k in SEARCH_FILTERS)
+    facets = facet_counts(result_dsets) if filtered else catalog_facets()
 
     # feel like I could be using urlparse in here somehow
     uri = request.get_full_path()
     if "page" in uri:
         index = uri.find("page")
-        print(index)
         uri = uri[: index - 1]
-    print(uri)
-    print(request.get_full_path())
 
     context = {
         "keyword": request.GET.get("query", ""),
-        "search_results": display_dsets,
+        "search_results": page_obj.object_list,
         "n_results": n_results,
         "page": page_obj,
-        "geographies": geographies,
-        "filetypes": ftypes,
+        "facets": facets,
         "uri": uri,
     }
 
@@ -178,5 +185,5 @@ def search(request):
 
 def random_dataset(request):
     return redirect(
-        "dataset-detail", DataSet.objects.all().order_by("?").values_list("id", flat=True)[0]
+        "dataset-detail", DataSet.objects.active().order_by("?").values_list("id", flat=True)[0]
     )
@@ -50,6 +50,10 @@ else:
         SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
         SECURE_HSTS_SECONDS = env.int("SECURE_HSTS_SECONDS", 3600)
 DATABASES = {"default": _DEFAULT_DB}
+# local memory is per-process, CACHE_URL can point to a shared file cache
+# (filecache:///path/to/dir) or database cache (dbcache://table_name, create
+# it with `manage.py createcachetable`)
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
 vars().update(EMAIL_CONFIG)
 
 ALLOWED_HOSTS = env.list("ALLOWED_HOSTS", default=["localhost", "127.0.0.1"])
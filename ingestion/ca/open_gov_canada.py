@@ -1,11 +1,10 @@
 from typing import Generator
 from dateutil.parser import parse as parse_date
 from ingestion.data_models import UpstreamDataset, PartialDataset, AltStr
-from ingestion.utils import make_request
+from ingestion.utils import make_request, stream_lines
 import lxml.html
 import json
 import csv
-import io
 import re
 from functools import reduce
 
@@ -19,10 +18,12 @@ def list_datasets() -> Generator[PartialDataset, None, None]:
     This method can either return a list or `yield` individual
     items as they're found.
 
-    The version below demonstrates yielding items, but
+    The catalog export is streamed & parsed as it downloads, each row is
+    yielded as soon as it's read. It's requested conditionally, so
+    incremental runs stop here (NotModified) if it hasn't changed since the
+    last run.
     """
-    data = make_request(CSV_URL)
-    for row in csv.DictReader(io.StringIO(data.text)):
+    for row in csv.DictReader(stream_lines(CSV_URL, conditional=True)):
         # fill last_updated with date_modified if it exists or date_published if not
         if row["date_modified"] == "":
             last_updated = parse_date(row["date_published"])
@@ -141,7 +142,6 @@ def get_file_formats_from_site():
     return file_formats
 
 
-ALL_FILE_FORMATS = get_file_formats_from_site()
 APPROVED_FORMATS = [
     "csv",
     "fgdb/gdb",
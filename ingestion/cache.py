@@ -0,0 +1,232 @@
+"""
+On-disk HTTP caching for ingestion.
+
+ResponseCache: unlike careful's dev cache, entries expire after a TTL and the
+cache is kept under a size cap by evicting the least recently used responses.
+
+ValidatorStore: ETag/Last-Modified values used for conditional requests.
+
+LookupCache: lookup tables scrapers build from upstream pages (e.g. lists of
+file formats), kept between runs so they don't have to be fetched every time.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import httpx
+
+DEFAULT_CACHE_PATH = "_cache/http.sqlite3"
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_VALIDATOR_PATH = "_cache/validators.sqlite3"
+DEFAULT_LOOKUP_PATH = "_cache/lookups.sqlite3"
+
+# request headers that change the response & so are part of the cache key
+KEY_HEADERS = ("accept", "accept-language")
+# response headers that no longer apply once the body has been decoded
+SKIP_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache, keyed on URL plus relevant request headers.
+
+    Safe to share between threads. The cache's total size is summed once when
+    it's opened & tracked in memory after that, so writes from another process
+    sharing the file only count towards max_bytes once it's reopened.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS response
+                   (key TEXT PRIMARY KEY, url TEXT, status INTEGER, encoding TEXT,
+                    headers TEXT, content BLOB, size INTEGER,
+                    created_at REAL, accessed_at REAL)"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS response_accessed_at ON response (accessed_at)"
+            )
+            # kept up to date by set/get/_evict rather than summed on every write
+            (self._total_bytes,) = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM response"
+            ).fetchone()
+
+    @staticmethod
+    def key(url: str, headers: dict | None = None) -> str:
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        parts = [url] + [f"{h}:{headers[h]}" for h in KEY_HEADERS if h in headers]
+        return hashlib.sha256("\n".join(parts).encode("utf8")).hexdigest()
+
+    def get(self, url: str, headers: dict | None = None) -> httpx.Response | None:
+        key = self.key(url, headers)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT status, encoding, headers, content, size, created_at FROM response"
+                " WHERE key=?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            status, encoding, resp_headers, content, size, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM response WHERE key=?", (key,))
+                self._total_bytes -= size
+                return None
+            self._conn.execute("UPDATE response SET accessed_at=? WHERE key=?", (now, key))
+
+        return httpx.Response(
+            status,
+            headers=json.loads(resp_headers),
+            content=content,
+            default_encoding=encoding,
+            request=httpx.Request("GET", url, headers=headers),
+        )
+
+    def set(self, url: str, headers: dict | None, response: httpx.Response):
+        resp_headers = {k: v for k, v in response.headers.items() if k.lower() not in SKIP_HEADERS}
+        content = response.content
+        key = self.key(url, headers)
+        now = time.time()
+        with self._lock, self._conn:
+            replaced = self._conn.execute(
+                "SELECT size FROM response WHERE key=?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response VALUES (?,?,?,?,?,?,?,?,?)",
+                (
+                    key,
+                    url,
+                    response.status_code,
+                    response.encoding,
+                    json.dumps(resp_headers),
+                    content,
+                    len(content),
+                    now,
+                    now,
+                ),
+            )
+            self._total_bytes += len(content) - (replaced[0] if replaced else 0)
+            self._evict()
+
+    def _evict(self):
+        """drop least recently used responses until the cache fits in max_bytes"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        excess = self._total_bytes - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM response ORDER BY accessed_at"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM response WHERE key=?", stale)
+        self._total_bytes -= freed
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM response")
+            self._total_bytes = 0
+
+
+class ValidatorStore:
+    """
+    Remembers the ETag/Last-Modified validators last seen for each URL.
+
+    New validators are held in memory until commit() so that an interrupted
+    run doesn't cause the next one to skip data it never finished ingesting.
+    """
+
+    def __init__(self, path: str = DEFAULT_VALIDATOR_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS validator
+                   (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT)"""
+            )
+
+    def get(self, url: str) -> tuple[str | None, str | None]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM validator WHERE url=?", (url,)
+            ).fetchone()
+        return row or (None, None)
+
+    def record(self, url: str, etag: str | None, last_modified: str | None):
+        if etag or last_modified:
+            with self._lock:
+                self._pending[url] = (etag, last_modified)
+
+    def commit(self):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO validator VALUES (?,?,?)",
+                [(url, *validators) for url, validators in self._pending.items()],
+            )
+            self._pending.clear()
+
+
+class LookupCache:
+    """
+    JSON-serializable values stored by key, with the time they were stored
+    and an optional version (e.g. the upstream modification time they were
+    derived from).
+
+    Safe to share between threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_LOOKUP_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS lookup
+                   (key TEXT PRIMARY KEY, value TEXT, version TEXT, created_at REAL)"""
+            )
+
+    def get(self, key: str, max_age_seconds: float | None = None, version: str | None = None):
+        """
+        stored value for key, or None if missing, older than max_age_seconds
+        or stored for a different version
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, version, created_at FROM lookup WHERE key=?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, stored_version, created_at = row
+        if max_age_seconds is not None and time.time() - created_at > max_age_seconds:
+            return None
+        if stored_version != version:
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value, version: str | None = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lookup VALUES (?,?,?,?)",
+                (key, json.dumps(value), version, time.time()),
+            )
@@ -0,0 +1,176 @@
+"""
+Metrics for ingestion runs.
+
+A single Metrics instance collects counters, gauges & histograms from the
+HTTP helpers in ingestion.utils and the ingest command. At the end of a run
+it's emitted as one structured log record and optionally written as a
+Prometheus textfile (for node_exporter's textfile collector).
+"""
+
+import os
+import time
+import bisect
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# upper bounds (seconds) of latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PROMETHEUS_PREFIX = "pdp_ingest"
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        # last slot counts observations above the largest bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """(le, count) pairs as Prometheus expects, ending with +Inf"""
+        pairs = []
+        total = 0
+        for le, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            pairs.append((le, total))
+        return pairs
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "mean": round(self.sum / self.count, 3) if self.count else 0,
+            "buckets": dict(self.cumulative()),
+        }
+
+
+class Metrics:
+    """
+    Thread-safe counters, gauges & histograms for one run, each optionally
+    labelled (e.g. `metrics.inc("http_requests", host="sdmx.oecd.org")`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = Counter()
+            self._gauges = {}
+            self._histograms = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[name, _label_key(labels)] += value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[name, _label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(value)
+
+    def total(self, name: str) -> float:
+        """a counter or gauge summed over all its labels, 0 if never recorded"""
+        with self._lock:
+            return sum(v for (n, _), v in self._counters.items() if n == name) + sum(
+                v for (n, _), v in self._gauges.items() if n == name
+            )
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """observe how long the block takes, in seconds"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start, **labels)
+
+    def summary(self) -> dict:
+        """
+        Everything recorded as a nested dict, for a single log record, e.g.
+        {"http_requests": {"host=sdmx.oecd.org,status=200": 12}, ...}
+        """
+        summary = {}
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                summary.setdefault(name, {})[_label_str(labels)] = value
+            for (name, labels), value in sorted(self._gauges.items()):
+                summary.setdefault(name, {})[_label_str(labels)] = value
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                summary.setdefault(name, {})[_label_str(labels)] = histogram.summary()
+        # unlabelled metrics don't need the extra level
+        return {
+            name: values[""] if list(values) == [""] else values for name, values in summary.items()
+        }
+
+    def to_prometheus(self, **labels) -> str:
+        """text exposition format, `labels` are added to every sample (e.g. scraper=)"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items())
+
+        def add(metric_type, samples, suffix=""):
+            last = None
+            for (name, key), value in samples:
+                metric = f"{PROMETHEUS_PREFIX}_{name}{suffix}"
+                if metric != last:
+                    lines.append(f"# TYPE {metric} {metric_type}")
+                    last = metric
+                yield metric, {**labels, **dict(key)}, value
+
+        for metric, sample_labels, value in add("counter", counters, "_total"):
+            lines.append(f"{metric}{_prometheus_labels(sample_labels)} {value}")
+        for metric, sample_labels, value in add("gauge", gauges):
+            lines.append(f"{metric}{_prometheus_labels(sample_labels)} {value}")
+        for metric, sample_labels, histogram in add("histogram", histograms):
+            for le, count in histogram.cumulative():
+                bucket_labels = _prometheus_labels({**sample_labels, "le": le})
+                lines.append(f"{metric}_bucket{bucket_labels} {count}")
+            lines.append(f"{metric}_sum{_prometheus_labels(sample_labels)} {histogram.sum}")
+            lines.append(f"{metric}_count{_prometheus_labels(sample_labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str, **labels):
+        """write to_prometheus() atomically, so a collector never sees a partial file"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus(**labels))
+        os.replace(tmp_path, path)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_str(key: tuple) -> str:
+    return ",".join(f"{k}={v}" for k, v in key)
+
+
+def _prometheus_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels.items()
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+# shared by all scrapers & threads in this process
+metrics = Metrics()
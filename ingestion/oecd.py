@@ -1,17 +1,35 @@
 from typing import Generator
-from httpx import HTTPStatusError
+from httpx import HTTPError, HTTPStatusError
 from dateutil.parser import parse as parse_date
 from ingestion.data_models import UpstreamDataset, PartialDataset, AltStr
 from ingestion.utils import make_request, logger
 from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import lxml.html
 import lxml.etree
+import threading
 import time
 
-LIST_URL = "https://aemint-search-client-funcapp-prod.azurewebsites.net/api/faceted-search?siteName=oecd&interfaceLanguage=en&orderBy=mostRelevant&page={}&pageSize=10&hiddenFacets=oecd-content-types%3Adata%2Fdatasets&hiddenFacets=oecd-languages%3Aen"
-DATASET_URL = "https://sdmx.oecd.org/public/rest/dataflow/{}/{}/?references=all"
+LIST_URL = "https://aemint-search-client-funcapp-prod.azurewebsites.net/api/faceted-search?siteName=oecd&interfaceLanguage=en&orderBy=mostRelevant&page={}&pageSize={}&hiddenFacets=oecd-content-types%3Adata%2Fdatasets&hiddenFacets=oecd-languages%3Aen"
+# categorisations are the only references we need, for tags
+DATASET_URL = "https://sdmx.oecd.org/public/rest/dataflow/{}/{}/?references=categorisation"
+CATEGORY_SCHEME_URL = "https://sdmx.oecd.org/public/rest/categoryscheme/{}/{}/{}"
 DOWNLOAD_URL = "https://sdmx.oecd.org/public/rest/data/{},{},/all?dimensionAtObservation=AllDimensions&format=csvfile"
 SITE_DOMAIN = "https://www.oecd.org/"
+# results per listing page, pages are 0-indexed
+LIST_PAGE_SIZE = 100
+# concurrent listing requests (still rate limited by make_request)
+LIST_WORKERS = 4
+
+# requests per minute for each host, see ingestion.utils.configure_rate_limits
+RATE_LIMITS = {
+    "aemint-search-client-funcapp-prod.azurewebsites.net": 60,
+    "sdmx.oecd.org": 20,
+}
+
+# {(agency, scheme id, version): category names}, see get_category_names
+_category_names = {}
+_category_names_lock = threading.Lock()
 
 headers = {
     "Accept": "application/xml",  # request XML format
@@ -24,14 +42,8 @@ ns = {
 }
 
 
-def retrieve_results_count():
-    """
-    Retrieve total dataset count.
-    Useful for iterating through page numbers in list_datasets().
-    """
-    resp = make_request(LIST_URL.format(0)).json()
-    count = int(resp["total"])
-    return count
+def get_listing_page(page: int) -> dict:
+    return make_request(LIST_URL.format(page, LIST_PAGE_SIZE)).json()
 
 
 def list_datasets() -> Generator[PartialDataset, None, None]:
@@ -39,17 +51,32 @@ def list_datasets() -> Generator[PartialDataset, None, None]:
     This method can either return a list or `yield` individual
     items as they're found.
 
-    The version below demonstrates yielding items, but
+    The first page gives the total dataset count, the remaining pages are
+    then fetched concurrently & yielded in completion order so details can
+    start right away. Datasets can shift between pages while we list them,
+    so URLs already seen are skipped.
     """
-    page_count = retrieve_results_count() // 10
-    for i in range(page_count + 1):
-        data = make_request(LIST_URL.format(i)).json()
+    seen = set()
+
+    def partial_datasets(data):
         for row in data["results"]:
+            if row["url"] in seen:
+                continue
+            seen.add(row["url"])
             yield PartialDataset(
                 url=row["url"],
                 last_updated=parse_date(row["publicationDateTime"]),
             )
 
+    first_page = get_listing_page(0)
+    yield from partial_datasets(first_page)
+
+    page_count = -(-int(first_page["total"]) // LIST_PAGE_SIZE)
+    with ThreadPoolExecutor(max_workers=LIST_WORKERS) as pool:
+        pages = [pool.submit(get_listing_page, i) for i in range(1, page_count)]
+        for page in as_completed(pages):
+            yield from partial_datasets(page.result())
+
 
 def get_dataset_details(pd: PartialDataset) -> UpstreamDataset:
     try:
@@ -128,24 +155,79 @@ def get_dataset_tags(root):
     This method retrieves a list of unique categorisations for a specific dataset.
 
     Each dataset seems to typically have only one categorisation but can occasionally
-    have multiple.
+    have multiple. A categorisation points at a category by its path in a category
+    scheme (e.g. "ECO.GDP"), every category along the path becomes a tag.
     """
     tags = set()
     categorisations = root.xpath("//structure:Categorisation", namespaces=ns)
-    categories = root.xpath("//structure:Category", namespaces=ns)
 
     for categorisation in categorisations:
         target = categorisation.xpath(".//structure:Target", namespaces=ns)[0]
-        ref_id = target.xpath(".//Ref")[0].get("id")
-        category_ids = ref_id.split(".")
-
-        for category_id in category_ids:
-            for category in categories:  # search for category name in category structure provided
-                if category.get("id") == category_id:
-                    category_name = category.xpath(
-                        './/common:Name[@xml:lang="en"]/text()', namespaces=ns
-                    )[0]
-                    tags.add(category_name)
-                    break
+        ref = target.xpath(".//Ref")[0]
+        category_names = get_category_names(
+            ref.get("agencyID"),
+            ref.get("maintainableParentID"),
+            ref.get("maintainableParentVersion"),
+        )
+        category_ids = ref.get("id").split(".")
+
+        for depth in range(1, len(category_ids) + 1):
+            path = ".".join(category_ids[:depth])
+            if path in category_names:
+                tags.add(category_names[path])
 
     return list(tags)
+
+
+def get_category_names(agency: str, scheme_id: str, version: str) -> dict[str, str]:
+    """
+    Index a category scheme as {category path: English name}.
+
+    Fetched once per scheme & shared by every dataset in the run, since most
+    datasets are categorised in the same couple of schemes. A scheme that
+    fails transiently (e.g. a 5xx) isn't remembered, the next dataset that
+    needs it tries again.
+    """
+    key = (agency, scheme_id, version)
+    # held while fetching, so worker threads don't fetch the same scheme twice
+    with _category_names_lock:
+        if key not in _category_names:
+            try:
+                _category_names[key] = fetch_category_names(agency, scheme_id, version)
+            except HTTPError as e:
+                logger.warning("skipping category scheme", scheme=scheme_id, error=str(e))
+                return {}
+        return _category_names[key]
+
+
+def fetch_category_names(agency: str, scheme_id: str, version: str) -> dict[str, str]:
+    """
+    get_category_names without the memo. Missing (404) or unparseable schemes
+    won't change during the run & index as {}, datasets just go without tags.
+    """
+    try:
+        resp = make_request(CATEGORY_SCHEME_URL.format(agency, scheme_id, version), headers=headers)
+    except HTTPStatusError as e:
+        if e.response.status_code != 404:
+            raise
+        logger.warning("skipping category scheme", scheme=scheme_id, error=str(e))
+        return {}
+    try:
+        root = lxml.etree.fromstring(resp.content)
+    except lxml.etree.XMLSyntaxError as e:
+        logger.warning("skipping category scheme", scheme=scheme_id, error=str(e))
+        return {}
+
+    names = {}
+
+    def index(parent, prefix):
+        for category in parent.xpath("./structure:Category", namespaces=ns):
+            path = prefix + category.get("id")
+            name = category.xpath('./common:Name[@xml:lang="en"]/text()', namespaces=ns)
+            if name:
+                names[path] = name[0]
+            index(category, path + ".")
+
+    for scheme in root.xpath("//structure:CategoryScheme", namespaces=ns):
+        index(scheme, "")
+    return names
@@ -0,0 +1,122 @@
+"""
+Per-host rate limiting for ingestion.
+
+Each host gets its own token bucket, so a scraper that talks to several hosts
+is only slowed down by the host it's currently waiting on. Buckets back off
+when a host responds 429 & gradually recover back to their configured limit.
+"""
+
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, UTC
+
+# floor for adaptive backoff, we never slow below this
+MIN_REQUESTS_PER_MINUTE = 1
+# fraction of the configured limit recovered per successful request after a backoff
+RECOVERY_STEP = 0.05
+
+
+class HostLimiter:
+    """
+    Thread-safe token bucket for a single host.
+
+    Callers reserve a slot with `reserve()` and then sleep for the returned
+    delay outside of the lock, so the same limiter can be shared by worker
+    threads and by asyncio tasks (which sleep with asyncio.sleep instead).
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int = 1):
+        self.max_requests_per_minute = requests_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> float:
+        """top up tokens for the time since the last call, returns the current interval"""
+        now = time.monotonic()
+        interval = 60.0 / self.requests_per_minute
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) / interval)
+        self._updated = now
+        return interval
+
+    def reserve(self) -> float:
+        """reserve the next request slot, returning how many seconds to wait for it"""
+        with self._lock:
+            interval = self._refill()
+            # tokens go negative as requests queue up, each one waits its turn
+            self._tokens -= 1
+            return max(0.0, -self._tokens * interval)
+
+    def backoff(self, retry_after: float | None = None):
+        """
+        Called on a 429, halves the rate & blocks the host for `retry_after`
+        seconds (or one interval at the new rate if the host didn't say).
+        """
+        with self._lock:
+            self._refill()
+            self.requests_per_minute = max(MIN_REQUESTS_PER_MINUTE, self.requests_per_minute / 2)
+            interval = 60.0 / self.requests_per_minute
+            wait = retry_after if retry_after is not None else interval
+            # go into debt so the next reservation waits out the block
+            self._tokens = min(self._tokens, 0.0) + 1 - wait / interval
+
+    def recover(self):
+        """called on a successful response, creeps back up to the configured rate"""
+        if self.requests_per_minute < self.max_requests_per_minute:
+            with self._lock:
+                self._refill()
+                self.requests_per_minute = min(
+                    self.max_requests_per_minute,
+                    self.requests_per_minute + self.max_requests_per_minute * RECOVERY_STEP,
+                )
+
+    def set_limit(self, requests_per_minute: float):
+        with self._lock:
+            self._refill()
+            self.max_requests_per_minute = requests_per_minute
+            self.requests_per_minute = requests_per_minute
+
+
+class RateLimits:
+    """
+    Registry of HostLimiters, hosts without a configured limit use the default.
+    """
+
+    def __init__(self, default_requests_per_minute: float):
+        self.default_requests_per_minute = default_requests_per_minute
+        self._limits = {}
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def configure(self, limits: dict[str, float]):
+        """set requests per minute for specific hosts, e.g. {"sdmx.oecd.org": 20}"""
+        with self._lock:
+            for host, requests_per_minute in limits.items():
+                self._limits[host] = requests_per_minute
+                if host in self._limiters:
+                    self._limiters[host].set_limit(requests_per_minute)
+
+    def for_host(self, host: str) -> HostLimiter:
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = HostLimiter(
+                    self._limits.get(host, self.default_requests_per_minute)
+                )
+            return self._limiters[host]
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After is either a number of seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(UTC)).total_seconds())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,151 @@
+"""
+Registry of scraper modules.
+
+Scrapers are found & checked by parsing their source rather than importing
+them, so listing or validating them never runs scraper code (or makes
+network requests) and works offline.
+"""
+
+import os
+import ast
+import glob
+from typing import NamedTuple
+
+SCRAPER_FUNCTIONS = ("list_datasets", "get_dataset_details", "get_full_datasets")
+ROOT = os.path.dirname(__file__)
+# cheap, side effect free calls that are fine at import time
+IMPORT_TIME_CALLS = {
+    "re.compile",
+    "logging.getLogger",
+    "structlog.get_logger",
+    "namedtuple",
+    "collections.namedtuple",
+    "TypeVar",
+    "typing.TypeVar",
+    "threading.Lock",
+    "threading.RLock",
+    "threading.Event",
+    "contextvars.ContextVar",
+    "defaultdict",
+    "dict",
+    "list",
+    "set",
+    "frozenset",
+    "tuple",
+}
+
+
+class ScraperModule(NamedTuple):
+    """
+    What a scraper module's source declares, see scan_module.
+    """
+
+    name: str
+    path: str
+    functions: dict[str, ast.FunctionDef | ast.AsyncFunctionDef]
+    rate_limits: dict[str, float]
+    problems: list[str]
+
+    @property
+    def hosts(self) -> set[str]:
+        return set(self.rate_limits)
+
+    @property
+    def is_async(self) -> bool:
+        return any(isinstance(f, ast.AsyncFunctionDef) for f in self.functions.values())
+
+    @property
+    def strategy(self) -> str | None:
+        if "list_datasets" in self.functions and "get_dataset_details" in self.functions:
+            return "list+details"
+        if "get_full_datasets" in self.functions:
+            return "full"
+        return None
+
+
+def discover(root: str = ROOT) -> dict[str, ScraperModule]:
+    """
+    Find every module under `root` that defines any of the scraper functions.
+
+    Returns {name: ScraperModule} where name is the import path after
+    `ingestion.`, as passed to `manage.py ingest`.
+    """
+    scrapers = {}
+    # not every subdirectory has an __init__.py, so walk files not packages
+    for path in sorted(glob.glob(f"{root}/**/*.py", recursive=True)):
+        name = os.path.relpath(path, root).removesuffix(".py").replace(os.sep, ".")
+        if name.endswith("__init__"):
+            continue
+        module = scan_module(name, path)
+        if module.functions:
+            scrapers[name] = module
+    return scrapers
+
+
+def scan_module(name: str, path: str) -> ScraperModule:
+    """parse a module's source & check it against the scraper protocol"""
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    functions = {}
+    rate_limits = {}
+    problems = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if node.name in SCRAPER_FUNCTIONS:
+                functions[node.name] = node
+        elif isinstance(node, ast.Assign) and _assigns(node, "RATE_LIMITS"):
+            try:
+                rate_limits = ast.literal_eval(node.value)
+            except ValueError:
+                problems.append("RATE_LIMITS must be a literal dict of host: requests per minute")
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and (
+            call := _find_call(node)
+        ):
+            problems.append(
+                f"line {call.lineno}: calls {ast.unparse(call.func)}() at import time, "
+                "load it lazily instead"
+            )
+
+    module = ScraperModule(name, path, functions, rate_limits, problems)
+    problems.extend(validate(module))
+    return module
+
+
+def validate(module: ScraperModule) -> list[str]:
+    """problems with how a module implements the scraper protocol"""
+    problems = []
+    functions = module.functions
+    if module.strategy is None and functions:
+        problems.append(
+            "must define list_datasets & get_dataset_details, or get_full_datasets "
+            f"(found {', '.join(functions)})"
+        )
+    if "get_dataset_details" in functions and len(functions["get_dataset_details"].args.args) != 1:
+        problems.append("get_dataset_details must take a single PartialDataset argument")
+    for name in ("list_datasets", "get_full_datasets"):
+        if name in functions and functions[name].args.args:
+            problems.append(f"{name} must not take arguments")
+    if not isinstance(module.rate_limits, dict) or not all(
+        isinstance(host, str) and isinstance(limit, (int, float))
+        for host, limit in module.rate_limits.items()
+    ):
+        problems.append("RATE_LIMITS must be a literal dict of host: requests per minute")
+    return problems
+
+
+def _assigns(node: ast.Assign, name: str) -> bool:
+    return any(isinstance(target, ast.Name) and target.id == name for target in node.targets)
+
+
+def _find_call(node: ast.AST) -> ast.Call | None:
+    """
+    first call in a module-level statement that isn't in IMPORT_TIME_CALLS,
+    ignoring `if __name__ == "__main__":`
+    """
+    if isinstance(node, ast.If) and "__name__" in ast.unparse(node.test):
+        return None
+    for child in ast.walk(node):
+        if isinstance(child, ast.Call) and ast.unparse(child.func) not in IMPORT_TIME_CALLS:
+            return child
+    return None
@@ -1,11 +1,10 @@
 from typing import Generator
 from dateutil.parser import parse as parse_date
 from ingestion.data_models import UpstreamDataset, PartialDataset
-from ingestion.utils import make_request, logger
+from ingestion.utils import make_request, stream_lines, logger
 import lxml.html
 import json
 import csv
-import io
 
 """
 The town uses the "OpenDataSoft" platform & API.
@@ -20,10 +19,12 @@ def list_datasets() -> Generator[PartialDataset, None, None]:
     This method can either return a list or `yield` individual
     items as they're found.
 
-    The version below demonstrates yielding items, but
+    The catalog export is streamed & parsed as it downloads, each row is
+    yielded as soon as it's read. It's requested conditionally, so
+    incremental runs stop here (NotModified) if it hasn't changed since the
+    last run.
     """
-    data = make_request(CSV_URL)
-    for row in csv.DictReader(io.StringIO(data.text)):
+    for row in csv.DictReader(stream_lines(CSV_URL, conditional=True)):
         yield PartialDataset(
             url=RECORD_URL.format(row["datasetid"]),
             last_updated=parse_date(row["default.modified"]),
@@ -1,8 +1,9 @@
 from dateutil.parser import parse as parse_date
 from ingestion.data_models import UpstreamDataset, PartialDataset
-from ingestion.utils import make_request, logger
+from ingestion.utils import make_request, cached_lookup, logger
 from time import sleep
 from httpx import HTTPStatusError
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
 
 """
@@ -22,11 +23,20 @@ ODATA_URL = "https://data.cityofchicago.org/api/odata/v4/{}"
 
 # ids that are known to have errors
 KNOWN_BAD = ("uwhj-p95a", "6mep-ry2s")
+# datasets per catalog page, must match limit= in CATALOG
+PAGE_SIZE = 100
+# statuses meaning a dataset has no OData endpoint, other errors aren't cached
+MISSING_STATUSES = (404, 410)
+# concurrent OData availability checks (still rate limited by make_request)
+PROBE_WORKERS = 8
 
 
-def extract_datasets(catalog):
-    """takes catalog page of 100 datasets, returns list of upstream datasets"""
-    upstream_lst = []
+def extract_datasets(catalog, pool):
+    """
+    takes catalog page of 100 datasets, yields upstream datasets as soon as
+    their OData availability checks (run on `pool`) finish
+    """
+    probes = {}
 
     # create UpstreamDatasets
     for ds in catalog["results"]:
@@ -69,42 +79,83 @@ def extract_datasets(catalog):
             license=license,
             tags=tags,
         )
-        # check if odata link exists, use for download
-        odata = ODATA_URL.format(uds.upstream_id)
+        probes[pool.submit(get_download_url, ds)] = uds
+
+    for probe in as_completed(probes):
+        uds = probes[probe]
+        uds.add_file(url=probe.result(), file_type="csv")
+        yield uds
+
+
+def get_download_url(ds):
+    """
+    OData url if one exists, otherwise the portal page
+
+    Availability is cached between runs & only checked again once the
+    dataset's updatedAt changes.
+    """
+    rs = ds["resource"]
+    odata = ODATA_URL.format(rs["id"])
+    try:
+        available = cached_lookup(
+            f"us.chicago.odata.{rs['id']}",
+            lambda: odata_available(odata),
+            version=rs["updatedAt"],
+        )
+    except Exception as e:
+        # not cached, so it's checked again next run
+        logger.warning(f"error retrieving {odata}: {e}")
+        available = False
+
+    if available:
+        return odata
+    # otherwise just link to portal page
+    return ds["link"]
+
+
+def odata_available(odata):
+    """
+    check if odata link exists without downloading the service document
+
+    Only a definitive answer (404/410) is False, other errors (e.g. 5xx or a
+    429 that outlasted the retries) are raised so they aren't cached.
+    """
+    try:
+        make_request(odata, method="HEAD")
+    except HTTPStatusError as e:
+        if e.response.status_code != 405:
+            return _missing(e)
+        # HEAD not supported, fetch a single byte instead
         try:
-            resp = make_request(odata)
+            make_request(odata, headers={"Range": "bytes=0-0"})
         except HTTPStatusError as e:
-            logger.warning(f"error retrieving {odata}: {e}")
-            continue
-        except Exception as e:
-            logger.warning(f"error retrieving {odata}: {e}")
-            continue
-
-        if resp.status_code == 200:
-            download_url = odata
-        # otherwise just link to portal page
-        else:
-            download_url = ds["link"]
-        uds.add_file(url=download_url, file_type="csv")
-        upstream_lst.append(uds)
+            return _missing(e)
+    return True
+
 
-    return upstream_lst
+def _missing(error: HTTPStatusError) -> bool:
+    if error.response.status_code in MISSING_STATUSES:
+        return False
+    raise error
+
+
+def get_catalog_page(offset):
+    resp = make_request(CATALOG.format(str(offset)))
+    return json.loads(resp.text)
 
 
 def get_full_datasets():
-    """handles catalog pagination to return complete list of datasets"""
+    """handles catalog pagination, yielding datasets as they're hydrated"""
     offset = 0
-    upstream_lst = []
-
-    while True:
-        url = CATALOG.format(str(offset))
-        resp = make_request(url)
-        cat = json.loads(resp.text)
-        new_sets = extract_datasets(cat)
-        if not new_sets:
-            break
-        upstream_lst.extend(new_sets)
-        offset += 100
-        print("OFFSET", offset)
-
-    return upstream_lst
+
+    with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as pool:
+        next_page = pool.submit(get_catalog_page, offset)
+        while True:
+            cat = next_page.result()
+            if not cat["results"]:
+                break
+            offset += PAGE_SIZE
+            # fetch the next page while this one's probes run
+            next_page = pool.submit(get_catalog_page, offset)
+            yield from extract_datasets(cat, pool)
+            logger.info("catalog page", offset=offset)
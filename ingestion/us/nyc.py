@@ -14,8 +14,7 @@ ODATA_URL = "https://data.cityofnewyork.us/api/odata/v4/{}"
 
 
 def extract_datasets(catalog):
-
-    datasets = []
+    """yields an UpstreamDataset for each dataset on a catalog page"""
 
     for ds in catalog["results"]:
 
@@ -42,15 +41,13 @@ def extract_datasets(catalog):
             file_type="csv"
         )
 
-        datasets.append(dataset)
-
-    return datasets
+        yield dataset
 
 
 def get_full_datasets():
+    """handles catalog pagination, yielding datasets page by page"""
 
     offset = 0
-    all_datasets = []
 
     while True:
 
@@ -60,13 +57,9 @@ def get_full_datasets():
 
         catalog = json.loads(resp.text)
 
-        new_sets = extract_datasets(catalog)
-
-        if not new_sets:
+        if not catalog["results"]:
             break
 
-        all_datasets.extend(new_sets)
+        yield from extract_datasets(catalog)
 
         offset += 100
-
-    return all_datasets
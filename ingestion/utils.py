@@ -1,22 +1,529 @@
+import os
+import time
+import codecs
+import tempfile
+import threading
+import asyncio
+import contextvars
 import httpx
 import structlog
+from contextlib import contextmanager
+from urllib.parse import urlparse
 from careful.httpx import make_careful_client_from_env
+from ingestion.ratelimit import RateLimits, parse_retry_after
+from ingestion.metrics import metrics
+from ingestion.cache import (
+    ResponseCache,
+    ValidatorStore,
+    LookupCache,
+    DEFAULT_CACHE_PATH,
+    DEFAULT_TTL_SECONDS,
+)
 
 # shared logger for all ingestors
 logger = structlog.get_logger("pdp.ingestion")
 
+# limit for any host a scraper hasn't configured, see configure_rate_limits
+DEFAULT_REQUESTS_PER_MINUTE = 30
+# how many times a 429 is retried (after waiting) before giving up
+MAX_RATE_LIMIT_RETRIES = 3
+MAX_CONNECTIONS = 50
+# retries for other failed requests (5xx etc.), see _should_retry
+RETRY_ATTEMPTS = 1
+RETRY_WAIT_SECONDS = 10
+# bytes of a downloaded body stream_lines decodes at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+# seconds spent in make_request by the current request_time() block
+_request_seconds = contextvars.ContextVar("request_seconds", default=None)
+
+
+class NotModified(Exception):
+    """
+    Raised by make_request(conditional=True) when the upstream responds
+    304 Not Modified, meaning nothing has changed since the last run.
+    """
+
+
+def _should_retry(response: httpx.Response) -> bool:
+    """careful's default rule, minus 429s which make_request handles per host"""
+    retry = response.status_code >= 400 and response.status_code not in (404, 429)
+    if retry:
+        metrics.inc("http_retries", host=response.request.url.host)
+    return retry
+
+
+# a single client is shared by all scrapers & threads so keep-alive
+# connections are pooled per host
 _client = make_careful_client_from_env(
-    requests_per_minute=30,
-    retry_attempts=1,
-    retry_wait_seconds=10,
+    client=httpx.Client(
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=20)
+    ),
+    retry_attempts=RETRY_ATTEMPTS,
+    retry_wait_seconds=RETRY_WAIT_SECONDS,
+    should_retry=_should_retry,
 )
+# throttling is handled per host here instead of by careful, since careful's
+# throttle is global & not safe to share between worker threads
+_rate_limits = RateLimits(DEFAULT_REQUESTS_PER_MINUTE)
+# used by async_make_request, created per event loop
+_async_client = None
+_async_client_loop = None
+# optional response cache, see configure_cache
+_cache = None
+# validators for conditional requests, see configure_conditional_requests
+_validators = None
+_send_validators = False
+# lookup tables kept between runs, see cached_lookup
+_lookups = None
+_refresh_lookups = False
+_refreshed = set()
 
 
-def make_request(url, headers=None):
+def configure_rate_limits(limits: dict[str, float]):
     """
-    Make an HTTP request with logging & error checking.
+    Set requests per minute for specific hosts.
+
+    Scraper modules can declare a RATE_LIMITS dict, which the ingest command
+    passes here before running them.
+    """
+    _rate_limits.configure(limits)
+    logger.info("rate limits", limits=limits)
+
+
+def configure_cache(
+    enabled: bool, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS
+):
+    """
+    Turn the on-disk response cache on or off for all subsequent requests.
+    """
+    global _cache
+    _cache = ResponseCache(path, ttl_seconds=ttl_seconds) if enabled else None
+    logger.info("response cache", enabled=enabled, path=path, ttl_seconds=ttl_seconds)
+
+
+def configure_conditional_requests(enabled: bool):
+    """
+    When enabled, make_request(conditional=True) sends the validators stored by
+    a previous run & raises NotModified if the upstream hasn't changed.
+
+    Validators are recorded either way, see commit_validators.
+    """
+    global _send_validators
+    _send_validators = enabled
+
+
+def commit_validators():
+    """
+    Persist validators seen during this run.
+
+    Call once a run has finished successfully, otherwise a failed run would
+    cause the next one to skip data it never ingested.
+    """
+    if _validators:
+        _validators.commit()
+
+
+def configure_lookups(refresh: bool):
+    """
+    When refresh is set, cached_lookup refetches every lookup table once
+    during this run instead of using the stored copy.
+    """
+    global _refresh_lookups
+    _refresh_lookups = refresh
+
+
+def cached_lookup(
+    key: str,
+    fetch,
+    refresh: bool = False,
+    max_age_seconds: float | None = None,
+    version: str | None = None,
+):
+    """
+    Return the value stored under key, calling fetch() to build it if it's
+    missing, older than max_age_seconds, stored for a different version or
+    a refresh was requested.
+
+    Scrapers should use this for lookup tables scraped from upstream pages
+    instead of fetching them at import time, and for per-dataset checks
+    that only need repeating when the dataset changes (pass its last
+    modified time as the version). fetch() must not return None, and
+    exceptions it raises aren't cached.
+    """
+    lookups = _get_lookups()
+    value = None
+    if not (refresh or (_refresh_lookups and key not in _refreshed)):
+        value = lookups.get(key, max_age_seconds, version)
+    if value is None:
+        logger.debug("fetching lookup", key=key)
+        value = fetch()
+        lookups.set(key, value, version)
+        _refreshed.add(key)
+    return value
+
+
+def _get_lookups() -> LookupCache:
+    global _lookups
+    if _lookups is None:
+        _lookups = LookupCache()
+    return _lookups
+
+
+def _get_validators() -> ValidatorStore:
+    global _validators
+    if _validators is None:
+        _validators = ValidatorStore()
+    return _validators
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """
+    An AsyncClient's connections belong to the event loop that opened them, so
+    each loop gets its own client (ingest runs async scrapers on a fresh loop).
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=20),
+            follow_redirects=True,
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+@contextmanager
+def request_time():
+    """
+    Collect the seconds make_request & async_make_request spend in the block,
+    throttling & retries included, as the only item of the yielded list.
+
+    Per thread (and asyncio task), requests made from threads the block
+    starts itself aren't counted.
+    """
+    spent = [0.0]
+    token = _request_seconds.set(spent)
+    try:
+        yield spent
+    finally:
+        _request_seconds.reset(token)
+
+
+def _add_request_time(start: float):
+    spent = _request_seconds.get()
+    if spent is not None:
+        spent[0] += time.monotonic() - start
+
+
+def _from_cache(url, headers, method="GET"):
+    if _cache and method == "GET":
+        resp = _cache.get(url, headers)
+        if resp is not None:
+            logger.debug("cache hit", url=url)
+            metrics.inc("cache_hits", host=urlparse(url).hostname)
+            return resp
+    return None
+
+
+def _request_headers(url, headers, conditional):
+    req_headers = dict(headers or {})
+    if conditional and _send_validators:
+        etag, last_modified = _get_validators().get(url)
+        if etag:
+            req_headers["If-None-Match"] = etag
+        if last_modified:
+            req_headers["If-Modified-Since"] = last_modified
+    return req_headers
+
+
+def _throttle_delay(url, limiter) -> float:
+    """reserve the next request slot for url's host, returning how long to wait"""
+    delay = limiter.reserve()
+    metrics.inc("throttle_wait_seconds", delay, host=urlparse(url).hostname)
+    return delay
+
+
+def _rate_limited(url, limiter, resp, elapsed) -> bool:
+    """
+    record a response & update the host's limiter from it, True if it was a
+    429 to retry
     """
-    resp = _client.get(url, headers=headers, follow_redirects=True)
+    host = urlparse(url).hostname
     logger.debug("request", url=url, status_code=resp.status_code)
+    metrics.inc("http_requests", host=host, status=resp.status_code)
+    metrics.observe("http_latency_seconds", elapsed, host=host)
+    if resp.status_code != 429:
+        limiter.recover()
+        return False
+    metrics.inc("http_rate_limited", host=host)
+    retry_after = parse_retry_after(resp.headers.get("retry-after"))
+    limiter.backoff(retry_after)
+    logger.warning(
+        "rate limited",
+        url=url,
+        retry_after=retry_after,
+        requests_per_minute=limiter.requests_per_minute,
+    )
+    return True
+
+
+def _finish(url, headers, resp, conditional, method="GET"):
+    if resp.status_code == 304:
+        raise NotModified(url)
     resp.raise_for_status()
+
+    metrics.inc("http_bytes", len(resp.content), host=urlparse(url).hostname)
+    if conditional:
+        _get_validators().record(url, resp.headers.get("etag"), resp.headers.get("last-modified"))
+    if _cache and method == "GET" and resp.status_code == 200:
+        _cache.set(url, headers, resp)
     return resp
+
+
+def make_request(url, headers=None, conditional=False, method="GET"):
+    """
+    Make an HTTP request with logging & error checking.
+
+    Safe to call from multiple threads, requests are throttled per host across
+    all of them. A 429 slows that host down & the request is retried after any
+    Retry-After the host asked for. Cached responses skip the throttle.
+
+    Scrapers should pass conditional=True for large listing payloads that rarely
+    change, and let the resulting NotModified propagate to skip the whole run.
+
+    method="HEAD" is useful for checking a URL exists without downloading it,
+    only GET responses are cached.
+    """
+    request_start = time.monotonic()
+    try:
+        resp = _from_cache(url, headers, method)
+        if resp is not None:
+            return resp
+
+        req_headers = _request_headers(url, headers, conditional)
+        limiter = _rate_limits.for_host(urlparse(url).hostname)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            time.sleep(_throttle_delay(url, limiter))
+            start = time.monotonic()
+            resp = _client.request(method, url, headers=req_headers, follow_redirects=True)
+            if not _rate_limited(url, limiter, resp, time.monotonic() - start):
+                break
+
+        return _finish(url, headers, resp, conditional, method)
+    finally:
+        _add_request_time(request_start)
+
+
+def stream_lines(url, headers=None, conditional=False):
+    """
+    Like make_request, but yields the body as decoded lines while it
+    downloads, so large files (e.g. catalog CSV exports) can be parsed
+    without holding them in memory. Lines keep their trailing newline, so
+    they can be passed straight to csv.reader/csv.DictReader.
+
+    The body is written to a temporary file as fast as it arrives & lines
+    are read back from it, so a slow consumer (e.g. list_datasets throttled
+    by the details requests) doesn't leave the connection unread until the
+    server times it out.
+
+    Validators & cached responses are only recorded once the whole body has
+    been read.
+    """
+    resp = _from_cache(url, headers)
+    if resp is not None:
+        yield from _split_lines([resp.text])
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        download = _BodyDownload(
+            url, _request_headers(url, headers, conditional), os.path.join(tmp_dir, "body")
+        )
+        download.start()
+        try:
+            resp = download.wait_for_response()
+            decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+
+            def decoded_chunks():
+                for chunk in download.chunks():
+                    yield decoder.decode(chunk)
+                yield decoder.decode(b"", final=True)
+
+            yield from _split_lines(decoded_chunks())
+        finally:
+            # also stops the download if the consumer gave up early
+            download.stop()
+
+        if conditional:
+            _get_validators().record(
+                url, resp.headers.get("etag"), resp.headers.get("last-modified")
+            )
+        if _cache and resp.status_code == 200:
+            with open(download.path, "rb") as f:
+                content = f.read()
+            _cache.set(
+                url,
+                headers,
+                httpx.Response(
+                    resp.status_code, headers=resp.headers, content=content, request=resp.request
+                ),
+            )
+
+
+class _BodyDownload(threading.Thread):
+    """
+    Streams a GET response body to `path` in the background for stream_lines.
+
+    Requests are throttled & retried like make_request. Errors (including
+    NotModified) are re-raised by wait_for_response or chunks in the
+    consuming thread, after any of the body that did arrive.
+    """
+
+    def __init__(self, url, req_headers, path):
+        super().__init__(daemon=True)
+        self.url = url
+        self.req_headers = req_headers
+        self.path = path
+        self.response = None
+        self.error = None
+        self.size = 0
+        self.finished = False
+        self.stopped = False
+        self.changed = threading.Condition()
+
+    def run(self):
+        try:
+            self._download()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.changed:
+                self.finished = True
+                self.changed.notify_all()
+
+    def _download(self):
+        limiter = _rate_limits.for_host(urlparse(self.url).hostname)
+        retried = False
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            time.sleep(_throttle_delay(self.url, limiter))
+            start = time.monotonic()
+            # careful only wraps client.request, so streamed requests are retried here
+            with _client.stream(
+                "GET", self.url, headers=self.req_headers, follow_redirects=True
+            ) as resp:
+                # latency to the response headers, the body is timed separately
+                if _rate_limited(self.url, limiter, resp, time.monotonic() - start):
+                    continue
+                if not retried and _should_retry(resp):
+                    retried = True
+                    logger.warning("retrying", url=self.url, status_code=resp.status_code)
+                    time.sleep(RETRY_WAIT_SECONDS)
+                    continue
+                if resp.status_code == 304:
+                    raise NotModified(self.url)
+                resp.raise_for_status()
+
+                with open(self.path, "wb") as f:
+                    with self.changed:
+                        self.response = resp
+                        self.changed.notify_all()
+                    for chunk in resp.iter_bytes():
+                        if self.stopped:
+                            return
+                        f.write(chunk)
+                        f.flush()
+                        metrics.inc("http_bytes", len(chunk), host=urlparse(self.url).hostname)
+                        with self.changed:
+                            self.size += len(chunk)
+                            self.changed.notify_all()
+                return
+
+        # still rate limited after every retry
+        resp.raise_for_status()
+
+    def wait_for_response(self) -> httpx.Response:
+        """the response (status & headers) once the body starts downloading"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.response is not None or self.finished)
+        if self.response is None:
+            raise self.error
+        return self.response
+
+    def chunks(self):
+        """yield the body as it's written, raising any error once it's exhausted"""
+        with open(self.path, "rb") as f:
+            while True:
+                with self.changed:
+                    self.changed.wait_for(lambda: self.size > f.tell() or self.finished)
+                    available = self.size - f.tell()
+                if available:
+                    yield f.read(min(available, STREAM_CHUNK_SIZE))
+                elif self.error:
+                    raise self.error
+                else:
+                    return
+
+    def stop(self):
+        self.stopped = True
+        self.join()
+
+
+def _split_lines(chunks):
+    """
+    split text chunks on newlines only, other line breaks (e.g. \u2028) can
+    appear inside CSV fields
+    """
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    if pending:
+        yield pending
+
+
+async def _async_request(method, url, headers) -> httpx.Response:
+    """request with the same retry policy the careful client applies to make_request"""
+    client = _get_async_client()
+    for attempt in range(RETRY_ATTEMPTS + 1):
+        last_attempt = attempt == RETRY_ATTEMPTS
+        try:
+            resp = await client.request(method, url, headers=headers)
+        except httpx.TransportError:
+            if last_attempt:
+                raise
+            metrics.inc("http_retries", host=urlparse(url).hostname)
+        else:
+            if last_attempt or not _should_retry(resp):
+                return resp
+        logger.warning("retrying", url=url, attempt=attempt + 1)
+        await asyncio.sleep(RETRY_WAIT_SECONDS)
+
+
+async def async_make_request(url, headers=None, conditional=False, method="GET"):
+    """
+    Async counterpart of make_request, for scrapers written as coroutines.
+
+    Shares the per-host rate limits, response cache & conditional request
+    validators with make_request, so mixing the two in one run is fine.
+    """
+    request_start = time.monotonic()
+    try:
+        resp = _from_cache(url, headers, method)
+        if resp is not None:
+            return resp
+
+        req_headers = _request_headers(url, headers, conditional)
+        limiter = _rate_limits.for_host(urlparse(url).hostname)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            await asyncio.sleep(_throttle_delay(url, limiter))
+            start = time.monotonic()
+            resp = await _async_request(method, url, req_headers)
+            if not _rate_limited(url, limiter, resp, time.monotonic() - start):
+                break
+
+        return _finish(url, headers, resp, conditional, method)
+    finally:
+        _add_request_time(request_start)